@@ -1,26 +1,50 @@
-from flask import Flask, request, jsonify
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, verify_jwt_in_request
 from flask_cors import CORS  # Import CORS for cross-origin requests
 from dotenv import load_dotenv
 import os
+import html
+import threading
+import time
 import requests
 import logging
+from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler, WatchedFileHandler
 from datetime import timedelta
-import json
+from typing import Dict
 
 
 # Import the client data service and routes
 from database.client_data_service import ClientDataService
 from database.user_service import UserService
+from database.shared_cache import SharedProfileCache, create_store
 from routes.client_routes import init_client_routes
+from routes.compression import compression
+from routes.http_cache import response_cache
+from routes.json_encoding import FastJSONProvider
+from routes.log_viewer import follow_lines, tail_lines
+from routes.metrics import init_metrics
+from instrumentation import profiler, registry
+from log_pipeline import parse_sample_rates, payload_logger, setup_logging
+from calculators import loan_products, mortgage
+from recommender.eligibility import EligibilityRules
+from recommender.segment_mapper import SegmentMapper
 
 # Load .env file
 load_dotenv()
 
 # Configure Flask & JWT
 app = Flask(__name__)
+# orjson-backed jsonify (NumPy scalars included), standard encoder if orjson is missing
+app.json = FastJSONProvider(app)
 # Enable CORS for all routes
 CORS(app)
+# gzip/brotli per Accept-Encoding for bodies of at least COMPRESSION_MIN_SIZE bytes
+compression.init_app(
+    app,
+    min_size=int(os.environ.get("COMPRESSION_MIN_SIZE", 1024)),
+    gzip_level=int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6)),
+    brotli_quality=int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 4))
+)
 
 JWT_SECRET_KEY = os.environ.get("JWT_SECRET")
 if not JWT_SECRET_KEY:
@@ -31,17 +55,44 @@ app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
 
 jwt = JWTManager(app)
 
-# API key for Mortgage Calculator
+# API key for the optional external mortgage cross-check
 API_NINJAS_KEY = os.environ.get("API_NINJAS")
+EXTERNAL_API_TIMEOUT = float(os.environ.get("EXTERNAL_API_TIMEOUT", 5))
+
+# Pooled HTTP session so outbound calls reuse connections
+http_session = requests.Session()
+http_session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
 
 # Logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("app.log"),
-        logging.StreamHandler()
-    ]
+LOG_FILE = "app.log"
+
+def _log_file_handler() -> logging.Handler:
+    """app.log, rotated by time if LOG_ROTATE_WHEN is set (e.g. "midnight"), else by size.
+
+    Rotating handlers are only safe in a single process: with several
+    workers (WEB_CONCURRENCY > 1, which uvicorn and gunicorn read as their
+    worker count) each would rotate app.log on its own and lose lines. Then
+    the file is only reopened after it was moved, and rotation is left to
+    logrotate (``create`` mode) or a similar external tool.
+    """
+    if int(os.environ.get("WEB_CONCURRENCY", 1)) > 1:
+        return WatchedFileHandler(LOG_FILE)
+    backups = int(os.environ.get("LOG_BACKUP_COUNT", 5))
+    if os.environ.get("LOG_ROTATE_WHEN"):
+        return TimedRotatingFileHandler(LOG_FILE, when=os.environ["LOG_ROTATE_WHEN"], backupCount=backups)
+    return RotatingFileHandler(
+        LOG_FILE, maxBytes=int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024)), backupCount=backups
+    )
+
+# Records are queued and written by a background thread; app.log gets JSON lines
+# (LOG_FORMAT=text for the plain format), LOG_SAMPLE_RATES="DEBUG:0.01,INFO:0.5"
+# keeps a fraction of those levels and LOG_PAYLOADS=1 logs full client/offer payloads
+log_listener = setup_logging(
+    _log_file_handler(),
+    level=logging.getLevelName(os.environ.get("LOG_LEVEL", "INFO").upper()),
+    json_file=os.environ.get("LOG_FORMAT", "json") == "json",
+    sample_rates=parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES")),
+    payloads=os.environ.get("LOG_PAYLOADS", "0").lower() in ("1", "true", "yes")
 )
 
 # Hardcoded admin user for development
@@ -51,16 +102,75 @@ USERS = {
 
 # Initialize client data service
 # Update the path to match your actual file location
-client_data_service = ClientDataService("database/database.db")
+client_data_service = ClientDataService(
+    # DATABASE_PATH serves another database, e.g. one from benchmarks/synthetic_data.py
+    os.environ.get("DATABASE_PATH", "database/database.db"),
+    pool_size=int(os.environ.get("DB_POOL_SIZE", 8)),
+    # Set COLUMNAR_CACHE_DIR to an empty value to disable /api/clients/aggregate
+    columnar_cache_dir=os.environ.get("COLUMNAR_CACHE_DIR", "database/columnar_cache") or None,
+    # Eligibility hashtags of the product catalogue, compiled once
+    eligibility_rules=EligibilityRules.from_csv("recommender/bank_products.csv")
+)
+
+# Build the products/offers recommendation indexes up front
+try:
+    client_data_service.load_catalogue()
+except Exception as e:
+    logging.error(f"Could not load product catalogue: {str(e)}")
 
 # Initialize user service for managing user authentication and data caching
-user_service = UserService(client_data_service)
+user_service = UserService(
+    client_data_service,
+    cache_max_entries=int(os.environ.get("USER_CACHE_MAX_ENTRIES", 10000)),
+    cache_max_bytes=int(os.environ.get("USER_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+    cache_ttl=float(os.environ.get("USER_CACHE_TTL", 3600)),
+    # e.g. file:///tmp/georgel-cache or redis://localhost:6379/0
+    shared_cache=SharedProfileCache(
+        create_store(os.environ["SHARED_CACHE_URL"]),
+        ttl=int(os.environ.get("USER_CACHE_TTL", 3600))
+    ) if os.environ.get("SHARED_CACHE_URL") else None
+)
 
 # Initialize client routes
 init_client_routes(app, client_data_service)
 
-with open("recommender/mapper.json", "r") as f:
-    mapper = json.load(f)
+# ETags / 304s for read-mostly routes, keyed on the data version bumped by db.py
+# loads and refreshes; RESPONSE_CACHE_MAX_BYTES > 0 also keeps the response bodies
+response_cache.init_app(
+    lambda: f"{client_data_service.data_version()}:{client_data_service.eligibility.fingerprint}",
+    max_bytes=int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 0)),
+    max_age=int(os.environ.get("HTTP_CACHE_MAX_AGE", 0))
+)
+client_data_service.add_refresh_listener(response_cache.clear)
+
+# Request timing, Server-Timing spans and Prometheus /metrics (scraped with
+# METRICS_TOKEN as bearer token, off without it); PROFILER_ENABLED=1 arms the
+# per-request sampling profiler at startup (see /admin/profiler)
+init_metrics(app, jwt, token=os.environ.get("METRICS_TOKEN"))
+profiler.enabled = os.environ.get("PROFILER_ENABLED", "0").lower() in ("1", "true", "yes")
+
+def _cache_stats() -> Dict[str, Dict]:
+    stats = {"user": user_service.user_cache.get_stats()}
+    if response_cache.bodies is not None:
+        stats["response"] = response_cache.bodies.get_stats()
+    return stats
+
+for _stat, _kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"),
+                     ("entries", "gauge"), ("bytes", "gauge")):
+    registry.callback(
+        f"app_cache_{_stat}" + ("_total" if _kind == "counter" else ""), f"In-process cache {_stat}.", ["cache"],
+        lambda stat=_stat: {(name,): cache[stat] for name, cache in _cache_stats().items()}, kind=_kind
+    )
+registry.callback("db_pool_connections", "Pooled SQLite connections by state.", ["state"],
+                  lambda: {(state,): client_data_service.get_pool_stats()[state] for state in ("in_use", "idle")})
+registry.callback("db_pool_waits_total", "Checkouts that had to wait for a free connection.", [],
+                  lambda: {(): client_data_service.get_pool_stats()["waits"]}, kind="counter")
+
+# Segment/cluster -> product associations of mapper.json, resolved against the catalogue
+segment_mapper = SegmentMapper.load("recommender/mapper.json", "recommender/bank_products.csv")
+
+# Loan products (rates, fees, limits) parsed once for the batch calculator
+bank_loan_products = loan_products.load_loan_products("recommender/bank_products.csv")
 
 # Login endpoint
 # In backend/app.py, modify the login endpoint:
@@ -83,19 +193,9 @@ def login():
         user_data = user_service.get_user_data(user_id)
         
         if user_data:
-            # *** ADD THESE PRINT STATEMENTS ***
-            print(f"\n{'='*50}")
-            print(f"CLIENT LOGIN SUCCESSFUL - ID: {user_id}")
-            print(f"{'='*50}")
-            
-            # Print all client features
-            for key, value in user_data.items():
-                print(f"{key}: {value}")
-            
-            print(f"{'='*50}")
-            print(f"Total features cached: {len(user_data)}")
-            print(f"{'='*50}\n")
-            
+            # All client features, only with LOG_PAYLOADS (formatted lazily)
+            payload_logger.debug("Client %s logged in with %d features: %s", user_id, len(user_data), user_data)
+
             # Create a token with the user ID
             access_token = create_access_token(identity=user_id)
             logging.info(f"User {user_id} logged in.")
@@ -114,6 +214,7 @@ def login():
 
 @app.route('/user/profile', methods=['GET'])
 @jwt_required()
+@response_cache.cached()
 def get_user_profile():
     current_user = get_jwt_identity()
     
@@ -127,24 +228,13 @@ def get_user_profile():
     if not user_data:
         return jsonify({"error": "User not found"}), 404
     
-    # *** ADD THESE PRINT STATEMENTS ***
-    print(f"\n{'='*50}")
-    print(f"PROFILE ACCESSED - ID: {current_user}")
-    print(f"{'='*50}")
-    print(f"Serving cached data with {len(user_data)} features")
-    
-    # Print some key features
-    key_features = ['ID', 'GPI_AGE', 'GPI_CUSTOMER_TYPE_DESC', 'CLIENT_TENURE']
-    for feature in key_features:
-        if feature in user_data:
-            print(f"  {feature}: {user_data[feature]}")
-    
-    print(f"{'='*50}\n")
-    
+    payload_logger.debug("Serving profile of %s with %d features", current_user, len(user_data))
+
     return jsonify(user_data)
 
 @app.route('/user/products', methods=['GET'])
 @jwt_required()
+@response_cache.cached()
 def get_user_products():
     current_user = get_jwt_identity()
 
@@ -152,19 +242,19 @@ def get_user_products():
 
     # Get user data
     user_data = user_service.get_user_data(current_user)
-    print(current_user)
-    
+
     if not user_data:
         return jsonify({"error": "User not found"}), 404
 
-    products = client_data_service.get_products_for_client(current_user)
+    products = client_data_service.get_products_for_client(current_user, user_data)
 
-    logging.info(f"Products for {current_user}: {products}")
+    payload_logger.debug("Products for %s: %s", current_user, products)
 
     return jsonify({"products": products})
 
 @app.route('/user/offers', methods=['GET'])
 @jwt_required()
+@response_cache.cached()
 def get_user_offers():
     current_user = get_jwt_identity()
 
@@ -176,12 +266,81 @@ def get_user_offers():
     if not user_data:
         return jsonify({"error": "User not found"}), 404
 
-    offers = client_data_service.get_offers_for_client(current_user)
+    offers = client_data_service.get_offers_for_client(current_user, user_data)
 
-    logging.info(f"Offers for {current_user}: {offers}")
+    payload_logger.debug("Offers for %s: %s", current_user, offers)
 
     return jsonify({"offers": offers})
 
+# Everything the dashboard needs after login, in one round trip
+@app.route('/user/dashboard', methods=['GET'])
+@jwt_required()
+@response_cache.cached()
+def get_user_dashboard():
+    current_user = get_jwt_identity()
+
+    logging.info(f"{current_user} accessed /user/dashboard")
+
+    if current_user == "admin":
+        return jsonify({"error": "Admin has no profile"}), 400
+
+    # Resolve the client row once and reuse it for the recommendations
+    user_data = user_service.get_user_data(current_user)
+    if not user_data:
+        return jsonify({"error": "User not found"}), 404
+
+    return jsonify({
+        "client_id": current_user,
+        "profile": user_data,
+        "segments": segment_mapper.describe_client(user_data),
+        "products": client_data_service.get_products_for_client(current_user, user_data),
+        "offers": client_data_service.get_offers_for_client(current_user, user_data)
+    })
+
+@app.route('/user/eligibility', methods=['GET'])
+@jwt_required()
+def get_user_eligibility():
+    current_user = get_jwt_identity()
+
+    logging.info(f"{current_user} accessed /user/eligibility")
+
+    eligibility = client_data_service.check_eligibility(current_user)
+    if eligibility is None:
+        return jsonify({"error": "User not found"}), 404
+
+    return jsonify({"client_id": current_user, "products": eligibility})
+
+@app.route('/user/recommendations', methods=['GET'])
+@jwt_required()
+def get_user_recommendations():
+    current_user = get_jwt_identity()
+
+    logging.info(f"{current_user} accessed /user/recommendations")
+
+    user_data = user_service.get_user_data(current_user)
+    if not user_data:
+        return jsonify({"error": "User not found"}), 404
+
+    limit = request.args.get('limit', type=int)
+    ineligible = client_data_service.eligibility.ineligible_ids(user_data)
+
+    return jsonify({
+        "client_id": current_user,
+        "segments": segment_mapper.describe_client(user_data),
+        "recommendations": segment_mapper.rank(user_data, exclude=ineligible, limit=limit)
+    })
+
+def fetch_external_mortgage(params: Dict) -> Dict:
+    """Ask api-ninjas for the same quote (optional cross-check of the local maths)."""
+    response = http_session.get(
+        'https://api.api-ninjas.com/v1/mortgagecalculator',
+        headers={'X-Api-Key': API_NINJAS_KEY},
+        params=params,
+        timeout=EXTERNAL_API_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json()
+
 # Calculate mortgage endpoint
 @app.route('/calculate-mortgage', methods=['POST'])
 @jwt_required()
@@ -189,46 +348,100 @@ def calculate_mortgage():
     current_user = get_jwt_identity()
     logging.info(f"{current_user} accessed /calculate-mortgage")
 
-    data = request.get_json()
-    
-    if 'interest_rate' not in data:
-        return jsonify({'error': 'interest_rate is required'}), 400
+    data = request.get_json() or {}
 
-    has_loan_amount = 'loan_amount' in data
-    has_home_value_and_downpayment = 'home_value' in data and 'downpayment' in data
+    try:
+        result = mortgage.calculate_mortgage(data)
+    except mortgage.MortgageInputError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Optional comparison against the external calculator
+    if data.get('cross_check') and API_NINJAS_KEY:
+        params = {k: data[k] for k in mortgage.MORTGAGE_PARAMS if k in data}
+        try:
+            result['external'] = fetch_external_mortgage(params)
+        except Exception as e:
+            logging.warning(f"Mortgage cross-check failed: {str(e)}")
+            result['external'] = {'error': str(e)}
+
+    return jsonify(result)
+
+# Amortisation schedule for a single loan
+@app.route('/calculate-mortgage/schedule', methods=['POST'])
+@jwt_required()
+def calculate_mortgage_schedule():
+    current_user = get_jwt_identity()
+    logging.info(f"{current_user} accessed /calculate-mortgage/schedule")
 
-    if not (has_loan_amount or has_home_value_and_downpayment):
-        return jsonify({'error': 'Either loan_amount or both home_value and downpayment must be provided.'}), 400
-    
-    allowed_params = [
-        "loan_amount",
-        "home_value",
-        "downpayment",
-        "interest_rate",  # required
-        "duration_years",
-        "monthly_hoa",
-        "annual_property_tax",
-        "annual_home_insurance"
-    ]
-
-    params = {k: data[k] for k in allowed_params if k in data}
+    data = request.get_json() or {}
 
     try:
-        response = requests.get(
-            'https://api.api-ninjas.com/v1/mortgagecalculator',
-            headers={'X-Api-Key': API_NINJAS_KEY},
-            params=params
-        )
-
-        if response.status_code == 200:
-            return jsonify(response.json())
-        else:
-            logging.error(f"API error: {response.text}")
-            return jsonify({'error': 'External API error', 'details': response.json()}), response.status_code
-    except Exception as e:
-        logging.error(f"Mortgage calculation error: {str(e)}")
-        return jsonify({'error': 'Failed to calculate mortgage', 'message': str(e)}), 500
+        loan = mortgage.parse_loan(data)
+    except mortgage.MortgageInputError as e:
+        return jsonify({'error': str(e)}), 400
+
+    schedule = mortgage.amortization_schedule(loan["principal"], loan["interest_rate"], loan["months"])
+    return jsonify({
+        'loan_amount': loan["principal"],
+        'interest_rate': loan["interest_rate"],
+        'months': loan["months"],
+        'schedule': {key: values.round(2).tolist() for key, values in schedule.items()}
+    })
+
+# Monthly payments for a grid of rates (%) and terms (years)
+@app.route('/calculate-mortgage/grid', methods=['POST'])
+@jwt_required()
+def calculate_mortgage_grid():
+    current_user = get_jwt_identity()
+    logging.info(f"{current_user} accessed /calculate-mortgage/grid")
+
+    data = request.get_json() or {}
+    rates = data.get('rates', [data['interest_rate']] if 'interest_rate' in data else None)
+    terms = data.get('terms', [data.get('duration_years', mortgage.DEFAULT_DURATION_YEARS)])
 
+    try:
+        if not rates or not terms:
+            raise mortgage.MortgageInputError('rates (list) or interest_rate, and terms, are required')
+        loan = mortgage.parse_loan({**data, 'interest_rate': rates[0]})
+        grid = mortgage.payment_grid(loan["principal"], rates, terms)
+    except (mortgage.MortgageInputError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'loan_amount': loan["principal"], **grid})
+
+
+# Compare every eligible loan product for one amount
+@app.route('/calculate-mortgage/batch', methods=['POST'])
+@jwt_required()
+def calculate_mortgage_batch():
+    current_user = get_jwt_identity()
+    logging.info(f"{current_user} accessed /calculate-mortgage/batch")
+
+    data = request.get_json() or {}
+
+    try:
+        amount = loan_products.parse_amount(data.get('amount', data.get('loan_amount')))
+        terms = loan_products.parse_terms(data['terms']) if 'terms' in data else None
+    except mortgage.MortgageInputError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Leave out products the client's profile rules out (other users, e.g. admin, see all)
+    products = bank_loan_products
+    ineligible = set()
+    user_data = user_service.get_user_data(current_user) if current_user != "admin" else None
+    if user_data:
+        ineligible = client_data_service.eligibility.ineligible_ids(user_data)
+        products = [product for product in bank_loan_products if product['id'] not in ineligible]
+
+    scenarios = loan_products.compare_loan_products(products, amount, terms)
+    cheapest = min(scenarios, key=lambda s: s['total_cost']) if scenarios else None
+
+    return jsonify({
+        'amount': amount,
+        'scenarios': scenarios,
+        'cheapest': cheapest,
+        'ineligible_products': sorted(ineligible)
+    })
 
 # Get all client IDs (for development only)
 @app.route('/clients/list', methods=['GET'])
@@ -248,30 +461,101 @@ def list_clients():
         "sample_clients": client_ids
     })
 
+# User cache statistics (admin only)
+@app.route('/admin/cache-stats', methods=['GET'])
+@jwt_required()
+def cache_stats():
+    current_user = get_jwt_identity()
+
+    if current_user != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return jsonify({
+        "user_cache": user_service.get_cache_stats(),
+        "response_cache": response_cache.bodies.get_stats() if response_cache.bodies is not None else None,
+        "data_version": client_data_service.data_version()
+    })
+
+# Sampling profiler switch and stored profiles (admin only)
+@app.route('/admin/profiler', methods=['GET', 'POST'])
+@jwt_required()
+def admin_profiler():
+    """GET lists stored profiles; POST {"enabled": true} arms profiling of
+    requests sent with an ``X-Profile: 1`` header, {"enabled": false} disarms it."""
+    current_user = get_jwt_identity()
+
+    if current_user != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        profiler.enabled = bool(data.get("enabled", not profiler.enabled))
+        logging.info(f"Sampling profiler {'enabled' if profiler.enabled else 'disabled'} by {current_user}")
+
+    return jsonify({"enabled": profiler.enabled, "profiles": profiler.list()})
+
+@app.route('/admin/profiler/<profile_id>', methods=['GET'])
+@jwt_required()
+def admin_profile(profile_id):
+    """One stored profile as collapsed stacks (flamegraph.pl / speedscope input)."""
+    if get_jwt_identity() != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    profile = profiler.get(profile_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return Response(profile["collapsed"] + "\n", mimetype="text/plain")
+
 # Catch-all error logger
 @app.errorhandler(Exception)
 def handle_exception(e):
     logging.exception("Unhandled exception occurred")
     return jsonify({"error": "Internal server error"}), 500
 
+# Live log streams: each one holds a worker thread, so they are capped in number and length
+LOG_FOLLOW_MAX_CLIENTS = int(os.environ.get("LOG_FOLLOW_MAX_CLIENTS", 2))
+LOG_FOLLOW_MAX_SECONDS = float(os.environ.get("LOG_FOLLOW_MAX_SECONDS", 600))
+log_followers = threading.BoundedSemaphore(LOG_FOLLOW_MAX_CLIENTS)
+
 # Home page shows logs
 @app.route("/")
 def home():
-    try:
-        tail = request.args.get("tail", default=50, type=int)  # default: last 50 lines
-        with open("app.log", "r") as f:
-            lines = f.readlines()
+    tail = request.args.get("tail", default=50, type=int)  # default: last 50 lines
+    tail = max(0, min(tail, 10000))
+
+    # ?follow=1 streams new lines as server-sent events after the last N (admin only)
+    if request.args.get("follow"):
+        verify_jwt_in_request()
+        if get_jwt_identity() != "admin":
+            return jsonify({"error": "Unauthorized"}), 403
+        if not log_followers.acquire(blocking=False):
+            return jsonify({"error": "Too many log followers, try again later"}), 429
+        response = Response(stream_with_context(_log_events(tail, time.monotonic() + LOG_FOLLOW_MAX_SECONDS)),
+                            mimetype="text/event-stream",
+                            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        # Runs when the stream ends or the client goes away, even before the first event
+        response.call_on_close(log_followers.release)
+        return response
 
-        # Select the last N lines and reverse the order
-        if tail is not None:
-            lines = lines[-tail:][::-1]
-
-        return f"<pre>{''.join(lines)}</pre>"
+    try:
+        # Read only the end of the file, newest line first
+        lines = tail_lines(LOG_FILE, tail)[::-1]
+        return f"<pre>{html.escape(''.join(lines))}</pre>"
 
     except Exception as e:
         logging.error(f"Could not read log file: {str(e)}")
         return "Error reading log file.", 500
 
+def _log_events(tail: int, deadline: float):
+    for line in tail_lines(LOG_FILE, tail):
+        yield f"data: {line.rstrip()}\n\n"
+    # Heartbeat comments keep proxies from timing out and detect closed clients
+    for line in follow_lines(LOG_FILE, heartbeat=min(15, max(deadline - time.monotonic(), 1))):
+        if time.monotonic() >= deadline:
+            yield ": stream time limit reached\n\n"
+            return
+        yield ": keep-alive\n\n" if line is None else f"data: {line}\n\n"
+
 # Health check endpoint
 @app.route("/health")
 def health_check():
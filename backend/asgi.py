@@ -0,0 +1,275 @@
+"""ASGI serving mode for the backend.
+
+Run with ``WEB_CONCURRENCY=4 uvicorn asgi:application`` from the backend
+directory (uvicorn takes its worker count from WEB_CONCURRENCY, and the app
+then leaves app.log rotation to logrotate, see ``_log_file_handler``).
+The hot user endpoints are served by native async handlers below; every
+other route is the regular Flask app, mounted through a WSGI adapter.
+Blocking SQLite work runs on a bounded thread pool and the external
+mortgage cross-check uses a shared async HTTP client, so a worker holds
+no thread while a request waits on I/O.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+
+import httpx
+import jwt as pyjwt
+from a2wsgi import WSGIMiddleware
+from flask_jwt_extended import decode_token
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_etags
+
+from app import (API_NINJAS_KEY, EXTERNAL_API_TIMEOUT, app as flask_app, client_data_service, segment_mapper,
+                 user_service)
+from calculators import mortgage
+from routes.compression import compression
+from routes.http_cache import response_cache
+from routes.metrics import REQUEST_SECONDS
+
+# Threads for blocking work (SQLite reads, cache I/O); defaults to the DB pool size
+BLOCKING_THREADS = int(os.environ.get("ASYNC_BLOCKING_THREADS", os.environ.get("DB_POOL_SIZE", 8)))
+
+# httpx logs every outbound request at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+blocking_pool = ThreadPoolExecutor(max_workers=BLOCKING_THREADS, thread_name_prefix="blocking")
+http_client = None
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the bounded pool without tying up the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(blocking_pool, partial(func, *args, **kwargs))
+
+
+def json_response(payload, status_code: int = 200) -> Response:
+    # Serialised by Flask's JSON provider, so both modes return identical bodies
+    with flask_app.app_context():
+        body = flask_app.json.response(payload).get_data()
+    return Response(body, status_code=status_code, media_type="application/json")
+
+
+class AuthError(Exception):
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def current_identity(request: Request) -> str:
+    """Identity of the request's JWT, validated like @jwt_required()."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise AuthError("Missing Authorization Header", 401)
+    try:
+        with flask_app.app_context():
+            return decode_token(token)[flask_app.config.get("JWT_IDENTITY_CLAIM", "sub")]
+    except pyjwt.ExpiredSignatureError:
+        raise AuthError("Token has expired", 401)
+    except Exception as e:
+        raise AuthError(str(e), 422)
+
+
+def authenticated(handler):
+    async def wrapper(request: Request) -> Response:
+        started = time.perf_counter()
+        try:
+            identity = current_identity(request)
+        except AuthError as e:
+            response = json_response({"msg": str(e)}, e.status_code)
+        else:
+            response = await handler(request, identity)
+        # Same histogram as the Flask routes (routes/metrics.py)
+        REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method,
+                                route=request.url.path, status=str(response.status_code))
+        return response
+    return wrapper
+
+
+def conditional(handler):
+    """ETag/304 and server-side body caching, shared with the Flask routes' ResponseCache."""
+    async def wrapper(request: Request, identity: str) -> Response:
+        # Same key as Flask's request.full_path, so both modes agree on ETags.
+        # The data version behind it stats the database and may query SQLite.
+        etag = await run_blocking(response_cache.etag_for, f"{request.url.path}?{request.url.query}", identity)
+        headers = {"ETag": f'"{etag}"', "Cache-Control": response_cache.cache_control()}
+        if parse_etags(request.headers.get("If-None-Match")).contains_weak(etag):
+            return Response(status_code=304, headers=headers)
+
+        hit = response_cache.get(etag)
+        if hit is not None:
+            body, mimetype = hit
+        else:
+            response = await handler(request, identity)
+            if response.status_code != 200:
+                return response
+            body, mimetype = response.body, response.media_type
+            response_cache.put(etag, body, mimetype)
+        return compressed_response(request, body, mimetype, headers)
+    return wrapper
+
+
+def compressed_response(request: Request, body: bytes, mimetype: str, headers: dict) -> Response:
+    """200 response, gzip/brotli-compressed like the Flask routes when large enough."""
+    body, encoding = compression.encode(body, mimetype, request.headers.get("Accept-Encoding"))
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        if "ETag" in headers:
+            headers["ETag"] = f"W/{headers['ETag']}"
+    return Response(body, media_type=mimetype, headers=headers)
+
+
+def _user_records(current_user: str, kind: str):
+    """Client row plus its products or offers, in one trip to the thread pool."""
+    user_data = user_service.get_user_data(current_user)
+    if not user_data:
+        return None
+    if kind == "products":
+        return client_data_service.get_products_for_client(current_user, user_data)
+    return client_data_service.get_offers_for_client(current_user, user_data)
+
+
+@authenticated
+@conditional
+async def get_user_profile(request: Request, current_user: str) -> Response:
+    if current_user == "admin":
+        return json_response({"error": "Admin has no profile"}, 400)
+
+    user_data = await run_blocking(user_service.get_user_data, current_user)
+    if not user_data:
+        return json_response({"error": "User not found"}, 404)
+
+    logging.info(f"{current_user} accessed /user/profile")
+    return json_response(user_data)
+
+
+@authenticated
+@conditional
+async def get_user_products(request: Request, current_user: str) -> Response:
+    logging.info(f"{current_user} accessed /user/products")
+
+    products = await run_blocking(_user_records, current_user, "products")
+    if products is None:
+        return json_response({"error": "User not found"}, 404)
+
+    return json_response({"products": products})
+
+
+@authenticated
+@conditional
+async def get_user_offers(request: Request, current_user: str) -> Response:
+    logging.info(f"{current_user} accessed /user/offers")
+
+    offers = await run_blocking(_user_records, current_user, "offers")
+    if offers is None:
+        return json_response({"error": "User not found"}, 404)
+
+    return json_response({"offers": offers})
+
+
+@authenticated
+@conditional
+async def get_user_dashboard(request: Request, current_user: str) -> Response:
+    logging.info(f"{current_user} accessed /user/dashboard")
+
+    if current_user == "admin":
+        return json_response({"error": "Admin has no profile"}, 400)
+
+    user_data = await run_blocking(user_service.get_user_data, current_user)
+    if not user_data:
+        return json_response({"error": "User not found"}, 404)
+
+    # Products and offers only need the row, so they are fetched concurrently
+    products, offers = await asyncio.gather(
+        run_blocking(client_data_service.get_products_for_client, current_user, user_data),
+        run_blocking(client_data_service.get_offers_for_client, current_user, user_data)
+    )
+    return json_response({
+        "client_id": current_user,
+        "profile": user_data,
+        "segments": segment_mapper.describe_client(user_data),
+        "products": products,
+        "offers": offers
+    })
+
+
+async def fetch_external_mortgage(params):
+    response = await http_client.get(
+        'https://api.api-ninjas.com/v1/mortgagecalculator',
+        headers={'X-Api-Key': API_NINJAS_KEY},
+        params=params
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+@authenticated
+async def calculate_mortgage(request: Request, current_user: str) -> Response:
+    logging.info(f"{current_user} accessed /calculate-mortgage")
+
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    data = data or {}
+
+    try:
+        result = mortgage.calculate_mortgage(data)
+    except mortgage.MortgageInputError as e:
+        return json_response({'error': str(e)}, 400)
+
+    if data.get('cross_check') and API_NINJAS_KEY:
+        params = {k: data[k] for k in mortgage.MORTGAGE_PARAMS if k in data}
+        try:
+            result['external'] = await fetch_external_mortgage(params)
+        except Exception as e:
+            logging.warning(f"Mortgage cross-check failed: {str(e)}")
+            result['external'] = {'error': str(e)}
+
+    return json_response(result)
+
+
+@asynccontextmanager
+async def lifespan(_):
+    global http_client
+    http_client = httpx.AsyncClient(
+        timeout=EXTERNAL_API_TIMEOUT,
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=4)
+    )
+    logging.info(f"ASGI mode started with {BLOCKING_THREADS} blocking threads")
+    try:
+        yield
+    finally:
+        await http_client.aclose()
+        blocking_pool.shutdown(wait=False)
+
+
+application = Starlette(
+    routes=[
+        Route('/user/profile', get_user_profile, methods=['GET']),
+        Route('/user/products', get_user_products, methods=['GET']),
+        Route('/user/offers', get_user_offers, methods=['GET']),
+        Route('/user/dashboard', get_user_dashboard, methods=['GET']),
+        Route('/calculate-mortgage', calculate_mortgage, methods=['POST']),
+        # Everything else is served by the Flask app
+        Mount('/', app=WSGIMiddleware(flask_app, workers=BLOCKING_THREADS)),
+    ],
+    # Flask-CORS only covers the mounted app; mirror its allow-all defaults
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(application, host="127.0.0.1", port=5000)
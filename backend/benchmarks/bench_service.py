@@ -0,0 +1,156 @@
+"""Micro-benchmarks of the ClientDataService and UserService methods.
+
+    python benchmarks/synthetic_data.py --rows 1M --db benchmarks/data/clients_1m.db
+    python benchmarks/bench_service.py --db benchmarks/data/clients_1m.db --save-baseline benchmarks/baselines/service_1m.json
+    python benchmarks/bench_service.py --db benchmarks/data/clients_1m.db --baseline benchmarks/baselines/service_1m.json
+
+Each method is called ``--iterations`` times (fewer for the full-table
+ones) on random clients and filters drawn from a seeded RNG, after a few
+warm-up calls, and reported as p50/p99 latency and calls per second. With
+``--baseline`` the run is compared to a stored one and the exit status is 1
+if any benchmark got slower than the tolerance. refresh_data is left out,
+as it rewrites the database.
+"""
+import argparse
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.report import DEFAULT_TOLERANCE, compare, print_table, save_baseline, summarize
+from database.client_data_service import ClientDataService
+from database.user_service import UserService
+from recommender.eligibility import EligibilityRules
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRODUCTS_CSV = os.path.join(BACKEND_DIR, "recommender", "bank_products.csv")
+
+# Benchmarks scanning the whole table run this fraction of --iterations
+FULL_SCAN_SHARE = 0.1
+
+
+def sample_ids(db_path: str, count: int, seed: int) -> List[str]:
+    conn = sqlite3.connect(db_path)
+    try:
+        total = conn.execute("SELECT MAX(rowid) FROM clients").fetchone()[0] or 0
+        rowids = random.Random(seed).sample(range(1, total + 1), min(count, total))
+        ids = []
+        for start in range(0, len(rowids), 500):
+            batch = rowids[start:start + 500]
+            ids += [row[0] for row in conn.execute(
+                f"SELECT ID FROM clients WHERE rowid IN ({', '.join('?' * len(batch))})", batch)]
+        return ids
+    finally:
+        conn.close()
+
+
+def cases(service: ClientDataService, users: UserService, ids: List[str],
+          rng: random.Random) -> List[Tuple[str, Callable[[], object], bool]]:
+    """(name, call, scans whole table) for every benchmarked method."""
+    def client():
+        return rng.choice(ids)
+
+    def cold_user():
+        client_id = client()
+        users.clear_cache(client_id)
+        return users.get_user_data(client_id)
+
+    warm_id = ids[0]
+    users.get_user_data(warm_id)
+    row = service.get_client_data(warm_id)
+
+    return [
+        ("data_version", service.data_version, False),
+        ("client_exists", lambda: service.client_exists(client()), False),
+        ("get_client_data", lambda: service.get_client_data(client()), False),
+        ("user_service.get_user_data[cold]", cold_user, False),
+        ("user_service.get_user_data[warm]", lambda: users.get_user_data(warm_id), False),
+        ("get_products_for_client", lambda: service.get_products_for_client(client()), False),
+        ("get_offers_for_client", lambda: service.get_offers_for_client(client()), False),
+        ("get_offers_for_client[with row]", lambda: service.get_offers_for_client(warm_id, row), False),
+        ("check_eligibility", lambda: service.check_eligibility(client()), False),
+        ("search_clients[offset page]", lambda: service.search_clients(
+            {"DEM_SEG": str(rng.randrange(6))}, limit=50, offset=rng.randrange(0, 500) * 50), False),
+        ("search_clients[keyset page]", lambda: service.search_clients(
+            {"GPI_AGE__gte": "30"}, limit=50, after_id=client()), False),
+        ("search_clients[fields]", lambda: service.search_clients(
+            {"GPI_COUNTY_NAME": "Cluj"}, limit=50, fields=["ID", "GPI_AGE", "CEC_AVG_BALANCE_AMT"]), False),
+        ("iter_clients[1000 rows]", lambda: sum(1 for _, _ in zip(range(1000), service.iter_clients({}))), False),
+        ("count_clients[cached]", lambda: service.count_clients({"DEM_SEG": "1"}), False),
+        ("count_clients[uncached]", lambda: service.count_clients({"GPI_AGE__gte": str(rng.randrange(10**6))}), True),
+        ("get_client_segments", service.get_client_segments, True),
+        ("get_average_balances", service.get_average_balances, False),
+        ("get_transaction_statistics", service.get_transaction_statistics, False),
+        ("analyze_spending_patterns", service.analyze_spending_patterns, False),
+        ("get_digital_engagement_stats", service.get_digital_engagement_stats, False),
+        ("aggregate_clients", lambda: service.aggregate_clients(
+            ["DEM_SEG"], ["count", "avg:CEC_AVG_BALANCE_AMT", "sum:MCC_FOOD_AMT"],
+            {"GPI_AGE__gte": str(rng.randrange(18, 60))}), True),
+        ("score_eligibility", lambda: service.score_eligibility({"DEM_SEG": str(rng.randrange(6))}), True),
+        ("get_sample_client_ids", lambda: service.get_sample_client_ids(10), False),
+    ]
+
+
+def run(service: ClientDataService, users: UserService, ids: List[str], iterations: int,
+        warmup: int, seed: int, only: List[str]) -> Dict[str, Dict]:
+    rng = random.Random(seed)
+    results = {}
+    for name, call, full_scan in cases(service, users, ids, rng):
+        if only and not any(part in name for part in only):
+            continue
+        count = max(3, int(iterations * FULL_SCAN_SHARE)) if full_scan else iterations
+        errors = 0
+        for _ in range(warmup):
+            call()
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(count):
+            call_started = time.perf_counter()
+            try:
+                call()
+            except Exception as e:
+                errors += 1
+                logging.warning(f"{name} failed: {str(e)}")
+            latencies.append(time.perf_counter() - call_started)
+        results[name] = summarize(latencies, time.perf_counter() - started, errors)
+        logging.info(f"{name}: p50 {results[name]['p50_ms']:.3f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark the client data service methods.")
+    parser.add_argument("--db", required=True, help="database built by db.py or synthetic_data.py")
+    parser.add_argument("--iterations", type=int, default=200, help="calls per benchmark")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed calls first")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="*", default=[], help="run only benchmarks whose name contains these")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed p50/p99 slowdown before a benchmark counts as regressed")
+    parser.add_argument("--save-baseline", help="write this run's results as a baseline JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    columnar_dir = tempfile.mkdtemp(prefix="bench-columnar-")
+    service = ClientDataService(args.db, columnar_cache_dir=columnar_dir,
+                                eligibility_rules=EligibilityRules.from_csv(PRODUCTS_CSV))
+    try:
+        service.load_catalogue()
+        users = UserService(service, cache_ttl=None)
+        ids = sample_ids(args.db, 1000, args.seed)
+        results = run(service, users, ids, args.iterations, args.warmup, args.seed, args.only)
+    finally:
+        service.close()
+        shutil.rmtree(columnar_dir, ignore_errors=True)
+
+    print_table(results, f"ClientDataService micro-benchmarks on {args.db}")
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results, {"db": os.path.abspath(args.db), "iterations": args.iterations})
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
@@ -0,0 +1,174 @@
+"""Concurrent load generator for a running backend.
+
+    DATABASE_PATH=benchmarks/data/clients_1m.db python app.py
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --concurrency 16 --duration 30 \
+        --save-baseline benchmarks/baselines/load_1m.json
+
+Every worker thread keeps its own HTTP session and, for the whole
+``--duration``, picks a scenario from a weighted mix of client and admin
+endpoints. Clients are drawn (seeded) from the served database and logged
+in once up front. Latencies are reported per scenario as p50/p99 with
+throughput, and compared to a baseline like bench_service.py does. With
+``--revalidate`` the workers send the ETag of their previous response, the
+way a browser revalidates, so the 304 path is measured instead.
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.report import DEFAULT_TOLERANCE, compare, print_table, save_baseline, summarize
+
+MORTGAGE_INPUT = {
+    "loan_amount": 250000,
+    "interest_rate": 4.5,
+    "home_value": 300000,
+    "downpayment": 50000,
+    "duration_years": 30,
+    "monthly_hoa": 100,
+    "annual_property_tax": 1500,
+    "annual_home_insurance": 1200,
+}
+
+# name -> (weight, method, path, admin token?, JSON body)
+SCENARIOS = {
+    "user.dashboard": (30, "GET", "/user/dashboard", False, None),
+    "user.profile": (15, "GET", "/user/profile", False, None),
+    "user.products": (15, "GET", "/user/products", False, None),
+    "user.offers": (15, "GET", "/user/offers", False, None),
+    "calculate_mortgage": (10, "POST", "/calculate-mortgage", False, MORTGAGE_INPUT),
+    "clients.page": (8, "GET", "/api/clients/?page={page}&page_size=50", True, None),
+    "clients.get": (4, "GET", "/api/clients/{client_id}", True, None),
+    "clients.segments": (3, "GET", "/api/clients/segments", True, None),
+}
+
+
+def login(session: requests.Session, url: str, user_id: str, password: Optional[str] = None) -> str:
+    response = session.post(f"{url}/login", json={"userId": user_id, "password": password}, timeout=30)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def fetch_client_ids(session: requests.Session, url: str, admin_token: str, count: int, seed: int) -> List[str]:
+    """IDs of ``count`` random clients of the first few pages the server returns."""
+    ids, after = [], None
+    while len(ids) < count * 10:
+        params = {"fields": "ID", "page_size": 1000, "format": "columns", **({"after": after} if after else {})}
+        response = session.get(f"{url}/api/clients/", params=params,
+                               headers={"Authorization": f"Bearer {admin_token}"}, timeout=60)
+        response.raise_for_status()
+        page = response.json()
+        ids += [row[0] for row in page["rows"]]
+        after = page["next_after"]
+        if after is None:
+            break
+    return random.Random(seed).sample(ids, min(count, len(ids)))
+
+
+class Worker(threading.Thread):
+    def __init__(self, url: str, tokens: Dict[str, str], admin_token: str, client_ids: List[str],
+                 deadline: float, seed: int, revalidate: bool):
+        super().__init__(daemon=True)
+        self.url = url
+        self.tokens = tokens
+        self.admin_token = admin_token
+        self.client_ids = client_ids
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.revalidate = revalidate
+        self.session = requests.Session()
+        self.etags = {}
+        # scenario -> per-request seconds; plus error counts
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def run(self):
+        names = list(SCENARIOS)
+        weights = [SCENARIOS[name][0] for name in names]
+        while time.perf_counter() < self.deadline:
+            name = self.rng.choices(names, weights)[0]
+            _, method, path, admin, body = SCENARIOS[name]
+            client_id = self.rng.choice(self.client_ids)
+            path = path.format(client_id=client_id, page=self.rng.randint(1, 20))
+            token = self.admin_token if admin else self.tokens[client_id]
+            headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip"}
+            etag_key = (path, token)
+            if self.revalidate and etag_key in self.etags:
+                headers["If-None-Match"] = self.etags[etag_key]
+
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, self.url + path, json=body, headers=headers, timeout=60)
+                response.content  # include the body transfer
+                elapsed = time.perf_counter() - started
+                if response.status_code >= 400:
+                    self.errors[name] += 1
+                elif "ETag" in response.headers:
+                    self.etags[etag_key] = response.headers["ETag"]
+            except requests.RequestException as e:
+                elapsed = time.perf_counter() - started
+                self.errors[name] += 1
+                logging.warning(f"{name} failed: {str(e)}")
+            self.latencies[name].append(elapsed)
+
+
+def run(url: str, concurrency: int, duration: float, users: int, seed: int, revalidate: bool) -> Dict[str, Dict]:
+    session = requests.Session()
+    admin_token = login(session, url, "admin", os.environ.get("ADMIN_PASSWORD", "1234"))
+    client_ids = fetch_client_ids(session, url, admin_token, users, seed)
+    if not client_ids:
+        raise RuntimeError("The server returned no clients")
+    tokens = {client_id: login(session, url, client_id) for client_id in client_ids}
+    logging.info(f"Logged in {len(tokens)} clients; running {concurrency} workers for {duration:.0f}s")
+
+    started = time.perf_counter()
+    workers = [Worker(url, tokens, admin_token, client_ids, started + duration, seed + i, revalidate)
+               for i in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in SCENARIOS:
+        latencies = [value for worker in workers for value in worker.latencies[name]]
+        results[name] = summarize(latencies, elapsed, sum(worker.errors[name] for worker in workers))
+    results["all"] = summarize([value for worker in workers for values in worker.latencies.values()
+                                for value in values], elapsed,
+                               sum(sum(worker.errors.values()) for worker in workers))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive a running backend with concurrent simulated users.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=8, help="worker threads")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument("--users", type=int, default=200, help="distinct clients to log in")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--revalidate", action="store_true", help="send If-None-Match with the last ETag")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed p50/p99 slowdown before a scenario counts as regressed")
+    parser.add_argument("--save-baseline", help="write this run's results as a baseline JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    results = run(args.url.rstrip("/"), args.concurrency, args.duration, args.users, args.seed, args.revalidate)
+
+    print_table(results, f"Load test of {args.url}: {args.concurrency} workers, {args.duration:.0f}s"
+                         + (", revalidating" if args.revalidate else ""))
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results, {"url": args.url, "concurrency": args.concurrency,
+                                                    "duration": args.duration, "revalidate": args.revalidate})
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
@@ -0,0 +1,81 @@
+"""Latency summaries and baseline comparison shared by the benchmark scripts."""
+import json
+import os
+import platform
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# A benchmark regresses when its p50 or p99 is this much slower than the baseline
+DEFAULT_TOLERANCE = 0.25
+
+
+def summarize(latencies: List[float], elapsed: Optional[float] = None, errors: int = 0) -> Dict:
+    """count, mean/p50/p99/max in milliseconds and throughput of a list of per-call seconds."""
+    samples = np.asarray(latencies, dtype=float) * 1000
+    if samples.size == 0:
+        return {"count": 0, "errors": errors}
+    p50, p99 = np.percentile(samples, [50, 99])
+    elapsed = elapsed if elapsed is not None else samples.sum() / 1000
+    return {
+        "count": int(samples.size),
+        "errors": errors,
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(samples.max()), 4),
+        "ops_per_s": round(samples.size / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def environment() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def print_table(results: Dict[str, Dict], title: str):
+    print(f"\n{title}")
+    print(f"{'benchmark':<44} {'count':>8} {'p50 ms':>10} {'p99 ms':>10} {'ops/s':>10} {'errors':>7}")
+    for name, stats in results.items():
+        if not stats.get("count"):
+            print(f"{name:<44} {'-':>8}")
+            continue
+        print(f"{name:<44} {stats['count']:>8} {stats['p50_ms']:>10.3f} {stats['p99_ms']:>10.3f} "
+              f"{stats['ops_per_s'] or 0:>10.1f} {stats['errors']:>7}")
+
+
+def save_baseline(path: str, results: Dict[str, Dict], meta: Dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"meta": {**environment(), **meta}, "results": results}, f, indent=2, sort_keys=True)
+    print(f"\nBaseline written to {path}")
+
+
+def compare(results: Dict[str, Dict], baseline_path: str, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Print the change against a stored baseline and return the regressed benchmarks.
+
+    Only benchmarks present in both runs are compared. Baselines are only
+    meaningful on the machine and data scale they were recorded with.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (recorded {baseline['meta'].get('recorded_at')}, "
+          f"tolerance {tolerance:.0%})")
+
+    regressions = []
+    for name, stats in results.items():
+        before = baseline["results"].get(name)
+        if not before or not before.get("count") or not stats.get("count"):
+            continue
+        changes = {key: stats[key] / before[key] - 1 for key in ("p50_ms", "p99_ms") if before[key] > 0}
+        regressed = any(change > tolerance for change in changes.values()) or stats["errors"] > before["errors"]
+        marker = "REGRESSED" if regressed else "ok"
+        print(f"{name:<44} " + "  ".join(f"{key} {change:+.1%}" for key, change in changes.items()) + f"  {marker}")
+        if regressed:
+            regressions.append(name)
+    return regressions
@@ -0,0 +1,214 @@
+"""Generate a synthetic clients database with the wide production schema.
+
+    python benchmarks/synthetic_data.py --rows 1M --db benchmarks/data/clients_1m.db
+    python benchmarks/synthetic_data.py --rows 10k --csv benchmarks/data/clients_10k.csv
+
+Clients get demographics, six segment columns, per-product balances,
+TRX_<kind>_CNT/_AMT, MCC_<category>_AMT spending, channel counters and the
+digital flags, drawn from a seeded RNG so every run with the same arguments
+produces the same data. Rows are generated and written in chunks, so 10M
+rows need no more memory than one chunk. ``--db`` writes a ready-to-serve
+database (catalogue, indexes, analytics snapshot, data version), ``--csv``
+writes clustered_clients.csv/cluster_offers.csv-shaped inputs for db.py.
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.analytics import DIGITAL_FLAGS, build_snapshot
+from database.db import SEGMENT_COLUMNS, bump_data_version, create_indexes, load_catalogue
+
+COUNTIES = ["Bucuresti", "Cluj", "Iasi", "Timis", "Constanta", "Brasov", "Dolj", "Prahova", "Bihor", "Arges",
+            "Sibiu", "Galati", "Suceava", "Mures", "Bacau"]
+OCCUPATIONS = ["Salariat", "Pensionar", "Student", "Liber profesionist", "Antreprenor", "Somer", "Elev"]
+EDUCATION = ["Gimnaziu", "Liceu", "Postliceala", "Universitate", "Master", "Doctorat"]
+BALANCE_PRODUCTS = ["CEC", "DEP", "CRT", "SAV", "INV"]
+TRX_KINDS = ["POS", "ATM", "IN_ALL", "OUT_ALL", "ONLINE", "TRANSFER", "P2P", "BILLS"]
+MCC_CATEGORIES = ["FOOD", "TRAVEL", "FUEL", "HEALTH", "FASHION", "ENTERTAINMENT", "ELECTRONICS", "UTILITIES",
+                  "EDUCATION", "HOME", "RESTAURANTS", "TRANSPORT"]
+CHANNEL_COUNTERS = ["CHNL_IB_LOGINS_CNT", "CHNL_MB_LOGINS_CNT", "CHNL_BRANCH_VISITS_CNT"]
+
+# Share of missing values in amount columns, as in the real export
+NULL_RATE = 0.02
+
+SCALES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_rows(value: str) -> int:
+    """"10k" -> 10000, "1M" -> 1000000, "2500" -> 2500."""
+    value = value.strip().lower()
+    if value and value[-1] in SCALES:
+        return int(float(value[:-1]) * SCALES[value[-1]])
+    return int(value)
+
+
+def client_schema(extra_mcc: int = 0) -> List[Tuple[str, str]]:
+    """(column, SQLite type) of the generated clients table, in order."""
+    columns = [
+        ("ID", "TEXT"), ("GPI_AGE", "INTEGER"), ("GPI_CUSTOMER_TYPE_DESC", "TEXT"), ("GPI_COUNTY_NAME", "TEXT"),
+        ("GPI_CLS_CODE_PT_OCCUP", "TEXT"), ("GPI_CLS_PT_EDU_DESC", "TEXT"), ("CLIENT_TENURE", "INTEGER"),
+    ]
+    for product in BALANCE_PRODUCTS:
+        columns += [(f"{product}_AVG_BALANCE_AMT", "REAL"), (f"{product}_TOTAL_BALANCE_AMT", "REAL")]
+    for kind in TRX_KINDS:
+        columns += [(f"TRX_{kind}_CNT", "INTEGER"), (f"TRX_{kind}_AMT", "REAL")]
+    categories = MCC_CATEGORIES + [f"EXTRA{i}" for i in range(extra_mcc)]
+    columns += [(f"MCC_{category}_AMT", "REAL") for category in categories]
+    columns += [(counter, "INTEGER") for counter in CHANNEL_COUNTERS]
+    columns += [("PTS_REJECTED_LOANS_REQ_CNT", "INTEGER")]
+    columns += [(flag, "INTEGER") for flag in DIGITAL_FLAGS]
+    columns += [(segment, "INTEGER") for segment in SEGMENT_COLUMNS]
+    return columns
+
+
+def generate_chunk(rng: np.random.Generator, start: int, size: int, schema: List[Tuple[str, str]],
+                   clusters: int, id_width: int) -> Dict[str, np.ndarray]:
+    """Columns of clients ``start`` .. ``start + size - 1``."""
+    data = {"ID": np.array([f"C{i:0{id_width}d}" for i in range(start, start + size)], dtype=object)}
+
+    # A few percent minors, so the under-18 rules are exercised
+    age = np.where(rng.random(size) < 0.03, rng.integers(14, 18, size), rng.integers(18, 86, size))
+    data["GPI_AGE"] = age
+    data["GPI_CUSTOMER_TYPE_DESC"] = np.where(rng.random(size) < 0.9, "PF", "PJ").astype(object)
+    data["GPI_COUNTY_NAME"] = np.array(COUNTIES, dtype=object)[rng.integers(0, len(COUNTIES), size)]
+    data["GPI_CLS_CODE_PT_OCCUP"] = np.array(OCCUPATIONS, dtype=object)[rng.integers(0, len(OCCUPATIONS), size)]
+    data["GPI_CLS_PT_EDU_DESC"] = np.array(EDUCATION, dtype=object)[rng.integers(0, len(EDUCATION), size)]
+    data["CLIENT_TENURE"] = np.minimum(rng.integers(0, 31, size), np.maximum(age - 14, 0))
+
+    # Wealth factor shared by the amount columns, so they correlate like real balances
+    wealth = rng.lognormal(0.0, 1.0, size)
+    for name, sql_type in schema:
+        if name in data:
+            continue
+        if name.endswith("_AMT"):
+            scale = 5000.0 if "BALANCE" in name else 300.0
+            values = np.round(wealth * rng.lognormal(np.log(scale), 0.8, size), 2)
+            values[rng.random(size) < NULL_RATE] = np.nan
+            data[name] = values
+        elif name.endswith("_CNT"):
+            data[name] = rng.poisson(0.3 if "REJECTED" in name else 12, size)
+        elif name.endswith("_FLAG"):
+            data[name] = (rng.random(size) < rng.uniform(0.1, 0.7)).astype(np.int64)
+        elif name in SEGMENT_COLUMNS:
+            data[name] = rng.integers(0, clusters, size)
+    return data
+
+
+def generate_clients(rows: int, seed: int = 42, chunksize: int = 100_000, clusters: int = 6,
+                     extra_mcc: int = 0) -> Iterator[Tuple[List[str], Dict[str, np.ndarray]]]:
+    """Yield ``(columns, data)`` chunks of the synthetic clients."""
+    schema = client_schema(extra_mcc)
+    columns = [name for name, _ in schema]
+    id_width = max(6, len(str(rows - 1)))
+    for start in range(0, rows, chunksize):
+        # Seeded per chunk start: the same arguments always produce the same rows
+        rng = np.random.default_rng([seed, start])
+        yield columns, generate_chunk(rng, start, min(chunksize, rows - start), schema, clusters, id_width)
+
+
+def generate_catalogue(clusters: int = 6, products_per_cluster: int = 4, offers_per_cluster: int = 3,
+                       catalogue_size: int = 40, seed: int = 42) -> pd.DataFrame:
+    """cluster_offers.csv-shaped frame: products (P*) and offers (O*) per segment and cluster."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for segment_id in range(len(SEGMENT_COLUMNS)):
+        for cluster in range(clusters):
+            for prefix, count in (("P", products_per_cluster), ("O", offers_per_cluster)):
+                for number in rng.choice(catalogue_size, count, replace=False):
+                    name = "Prod" if prefix == "P" else "Offer"
+                    link = f"https://example.com/{prefix.lower()}/{number}" if prefix == "O" else None
+                    rows.append((f"{prefix}{number}", segment_id, cluster, f"{name} {number}",
+                                 str(int(rng.random() < 0.5)), f"Synthetic {name.lower()} {number}", link))
+    return pd.DataFrame(rows, columns=["ID", "SEG_ID", "CLUS_ID", "PROD", "ELIG", "DESCR", "LINK"])
+
+
+def _sql_rows(columns: List[str], data: Dict[str, np.ndarray]) -> List[tuple]:
+    # NaN amounts become NULL when bound by sqlite3
+    return list(zip(*(data[column].tolist() for column in columns)))
+
+
+def write_database(db_path: str, rows: int, seed: int = 42, chunksize: int = 100_000, clusters: int = 6,
+                   extra_mcc: int = 0) -> Dict[str, float]:
+    """Build a complete database (clients, catalogue, indexes, snapshot) and return step timings."""
+    timings = {}
+    started = time.perf_counter()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA journal_mode=WAL")
+        schema = client_schema(extra_mcc)
+        definitions = ", ".join(f'"{name}" {sql_type}' for name, sql_type in schema)
+        conn.execute(f"CREATE TABLE clients ({definitions}, CONSTRAINT clients_pk PRIMARY KEY (\"ID\"))")
+
+        written = 0
+        insert = f"INSERT INTO clients VALUES ({', '.join('?' * len(schema))})"
+        for columns, data in generate_clients(rows, seed, chunksize, clusters, extra_mcc):
+            conn.executemany(insert, _sql_rows(columns, data))
+            written += len(data["ID"])
+            logging.info(f"Generated {written}/{rows} clients")
+        conn.commit()
+        timings["clients"] = round(time.perf_counter() - started, 3)
+
+        step_started = time.perf_counter()
+        load_catalogue(conn, generate_catalogue(clusters, seed=seed))
+        create_indexes(conn)
+        conn.commit()
+        build_snapshot(conn)
+        conn.execute("ANALYZE")
+        bump_data_version(conn)
+        conn.commit()
+        timings["catalogue_indexes_snapshot"] = round(time.perf_counter() - step_started, 3)
+    finally:
+        conn.close()
+
+    timings["total"] = round(time.perf_counter() - started, 3)
+    logging.info(f"Synthetic database {db_path} with {rows} clients built in {timings['total']:.3f}s")
+    return timings
+
+
+def write_csv(csv_path: str, rows: int, seed: int = 42, chunksize: int = 100_000, clusters: int = 6,
+              extra_mcc: int = 0, offers_csv: Optional[str] = None):
+    """Write the clients (and optionally the catalogue) as CSV inputs for database/db.py."""
+    header = True
+    for columns, data in generate_clients(rows, seed, chunksize, clusters, extra_mcc):
+        pd.DataFrame(data, columns=columns).to_csv(csv_path, mode="w" if header else "a", header=header,
+                                                   index=False)
+        header = False
+    if offers_csv:
+        generate_catalogue(clusters, seed=seed).to_csv(offers_csv, index=False)
+    logging.info(f"Synthetic clients CSV {csv_path} with {rows} rows written")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic wide-schema clients dataset.")
+    parser.add_argument("--rows", default="10k", help="number of clients, e.g. 10k, 1M, 10M")
+    parser.add_argument("--db", help="SQLite database to (re)create")
+    parser.add_argument("--csv", help="clients CSV to write instead of a database")
+    parser.add_argument("--offers-csv", help="with --csv, also write the cluster offers CSV here")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunksize", type=int, default=100_000, help="clients generated per batch")
+    parser.add_argument("--clusters", type=int, default=6, help="clusters per segment")
+    parser.add_argument("--extra-mcc", type=int, default=0, help="additional MCC_*_AMT columns to widen the table")
+    args = parser.parse_args()
+
+    if not args.db and not args.csv:
+        parser.error("one of --db or --csv is required")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    rows = parse_rows(args.rows)
+    if args.db:
+        os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+        write_database(args.db, rows, args.seed, args.chunksize, args.clusters, args.extra_mcc)
+    if args.csv:
+        os.makedirs(os.path.dirname(os.path.abspath(args.csv)), exist_ok=True)
+        write_csv(args.csv, rows, args.seed, args.chunksize, args.clusters, args.extra_mcc, args.offers_csv)
@@ -0,0 +1,200 @@
+import csv
+import re
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from calculators.mortgage import MAX_MONTHS, MortgageInputError, monthly_payment
+
+# Catalogue categories that are repaid as a fixed-instalment annuity
+AMORTISING_CATEGORIES = {"Loan", "Mortgage"}
+
+# Interest columns of bank_products.csv: DA_* is the nominal rate and DAE_*
+# the advertised APR, in the _V and _FV variants the bank publishes
+RATE_VARIANTS = {
+    "V": ("DA_V", "DAE_V"),
+    "FV": ("DA_FV", "DAE_FV"),
+}
+
+# Longest term that can be requested, in years; also the most terms per request
+MAX_TERM_YEARS = MAX_MONTHS // 12
+
+_NUMBER = re.compile(r"^\s*(\d+(?:[.,]\d+)?)")
+
+
+def parse_number(text: Optional[str]) -> Optional[float]:
+    """Read the leading number of a catalogue cell ("5.99 % fixa", "200 /an").
+
+    Returns None for empty cells, "-" and ranges such as "0.5-0.8 %".
+    """
+    if not text:
+        return None
+    match = _NUMBER.match(text)
+    if not match or re.search(r"\d", text[match.end():]):
+        return None
+    return float(match.group(1).replace(",", "."))
+
+
+def _monthly_fee(text: Optional[str], amount: float) -> float:
+    """Turn a recurring fee cell ("4.5% anual", "200 /an", "12 /luna") into a monthly amount."""
+    value = parse_number(text)
+    if value is None:
+        return 0.0
+    text = text.lower()
+    if "%" in text:
+        # Percent of the loan amount, per year unless stated per month
+        return amount * value / 100 / (1 if "luna" in text else 12)
+    if "/an" in text or "anual" in text:
+        return value / 12
+    return value
+
+
+def load_loan_products(csv_path: str) -> List[Dict]:
+    """Parse the amortising loan products of bank_products.csv once.
+
+    Every product with a numeric rate and maximum term yields one entry per
+    published rate variant.
+    """
+    products = []
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            if row.get("Categorie") not in AMORTISING_CATEGORIES:
+                continue
+            max_years = parse_number(row.get("TERMEN_MAX_ANI"))
+            if not max_years:
+                continue
+            # Amounts in another currency ("66500EUR") are not comparable, treat as unknown
+            max_amount = row.get("MAX_AMT", "").strip()
+            max_amount = float(max_amount) if max_amount.isdigit() else None
+
+            for variant, (rate_column, apr_column) in RATE_VARIANTS.items():
+                rate = parse_number(row.get(rate_column))
+                if rate is None:
+                    continue
+                products.append({
+                    "id": row["ID"],
+                    "name": row["Produs"],
+                    "category": row["Categorie"],
+                    "currency": row["Valuta"],
+                    "eligibility": row.get("Eligibilitate", ""),
+                    "rate_variant": variant,
+                    "interest_rate": rate,
+                    "advertised_apr": parse_number(row.get(apr_column)),
+                    "max_years": int(max_years),
+                    "max_amount": max_amount,
+                    "analysis_fee": parse_number(row.get("C_ANLZ")) or 0.0,
+                    "issue_fee": parse_number(row.get("C_EMIT")) or 0.0,
+                    "admin_fee": row.get("C_ADMIN") or "",
+                })
+    return products
+
+
+def _effective_monthly_rate(net_amount: np.ndarray, outflow: np.ndarray, months: np.ndarray,
+                            iterations: int = 60) -> np.ndarray:
+    """Solve net_amount = outflow * annuity_factor(i, months) for i, element-wise.
+
+    Vectorised bisection: the present value of the repayments falls
+    monotonically with the rate, so 60 halvings of [0, 1] are exact to well
+    below a basis point for every scenario at once.
+    """
+    low = np.zeros_like(net_amount)
+    high = np.ones_like(net_amount)
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        present_value = outflow * (1 - np.power(1 + mid, -months)) / mid
+        too_low = present_value > net_amount
+        low = np.where(too_low, mid, low)
+        high = np.where(too_low, high, mid)
+    return (low + high) / 2
+
+
+def parse_amount(value) -> float:
+    """A loan amount: a finite, positive number."""
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        raise MortgageInputError("amount must be a number")
+    if not np.isfinite(amount) or amount <= 0:
+        raise MortgageInputError("amount must be a positive number")
+    return amount
+
+
+def parse_terms(values: Iterable) -> List[int]:
+    """Requested terms in years, checked and without duplicates."""
+    if isinstance(values, (str, bytes, dict)):
+        raise MortgageInputError("terms must be a list of years")
+    try:
+        values = list(values)
+    except TypeError:
+        raise MortgageInputError("terms must be a list of years")
+    if len(values) > MAX_TERM_YEARS:
+        raise MortgageInputError(f"at most {MAX_TERM_YEARS} terms are allowed")
+    years = []
+    for value in values:
+        try:
+            year = float(value)
+        except (TypeError, ValueError):
+            raise MortgageInputError("terms must be a list of years")
+        if not year.is_integer() or not 1 <= year <= MAX_TERM_YEARS:
+            raise MortgageInputError(f"terms must be whole numbers of years from 1 to {MAX_TERM_YEARS}")
+        years.append(int(year))
+    # Keep the requested order, once per term
+    return list(dict.fromkeys(years))
+
+
+def compare_loan_products(products: Iterable[Dict], amount: float,
+                          terms: Optional[Iterable[int]] = None) -> List[Dict]:
+    """Evaluate every product variant and term for ``amount`` in one vectorised pass.
+
+    ``terms`` lists the durations in years to try; by default every whole
+    year up to each product's maximum. Products whose maximum amount or term
+    does not allow the request are skipped. Each scenario reports the
+    monthly payment (instalment plus recurring fees), total cost, total
+    interest and the effective APR implied by all fees.
+    ``amount`` must be a positive number and ``terms`` at most
+    MAX_TERM_YEARS whole numbers of years from 1 to MAX_TERM_YEARS
+    (duplicates are dropped); anything else raises MortgageInputError.
+    """
+    amount = parse_amount(amount)
+    if terms is not None:
+        terms = parse_terms(terms)
+
+    scenarios = []
+    for product in products:
+        if product["max_amount"] is not None and amount > product["max_amount"]:
+            continue
+        years = terms if terms is not None else range(1, product["max_years"] + 1)
+        for year in years:
+            if year <= product["max_years"]:
+                scenarios.append((product, int(year)))
+    if not scenarios:
+        return []
+
+    principal = np.full(len(scenarios), float(amount))
+    rates = np.array([product["interest_rate"] for product, _ in scenarios])
+    months = np.array([year * 12 for _, year in scenarios], dtype=np.float64)
+    upfront = np.array([product["analysis_fee"] + product["issue_fee"] for product, _ in scenarios])
+    fees = np.array([_monthly_fee(product["admin_fee"], amount) for product, _ in scenarios])
+
+    instalment = monthly_payment(principal, rates, months)
+    outflow = instalment + fees
+    total_cost = outflow * months + upfront
+    monthly_rate = _effective_monthly_rate(principal - upfront, outflow, months)
+    effective_apr = (np.power(1 + monthly_rate, 12) - 1) * 100
+
+    results = []
+    for i, (product, year) in enumerate(scenarios):
+        results.append({
+            "id": product["id"],
+            "name": product["name"],
+            "category": product["category"],
+            "rate_variant": product["rate_variant"],
+            "interest_rate": product["interest_rate"],
+            "advertised_apr": product["advertised_apr"],
+            "duration_years": year,
+            "monthly_payment": round(float(outflow[i]), 2),
+            "total_cost": round(float(total_cost[i]), 2),
+            "total_interest": round(float(instalment[i] * months[i] - amount), 2),
+            "effective_apr": round(float(effective_apr[i]), 2),
+        })
+    return results
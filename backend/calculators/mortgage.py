@@ -0,0 +1,178 @@
+from typing import Dict, Iterable
+
+import numpy as np
+
+# Defaults used by the api-ninjas mortgage calculator this module replaces
+DEFAULT_DURATION_YEARS = 30
+
+# Longest term accepted, in months (50 years); it also bounds the schedule length
+MAX_MONTHS = 600
+
+# Most rates, and most terms, a single payment grid may hold
+MAX_GRID_SIZE = 50
+
+MORTGAGE_PARAMS = [
+    "loan_amount",
+    "home_value",
+    "downpayment",
+    "interest_rate",  # required
+    "duration_years",
+    "monthly_hoa",
+    "annual_property_tax",
+    "annual_home_insurance"
+]
+
+
+class MortgageInputError(ValueError):
+    """Raised when the mortgage parameters are missing or invalid."""
+
+
+def monthly_payment(principal, annual_rate, months):
+    """Annuity payment for the given principal, annual rate in % and term in months.
+
+    Works element-wise on NumPy arrays (with broadcasting), so a whole grid of
+    rates/terms is computed in one call. A 0% rate repays the principal in
+    equal instalments.
+    """
+    principal = np.asarray(principal, dtype=np.float64)
+    rate = np.asarray(annual_rate, dtype=np.float64) / 100 / 12
+    months = np.asarray(months, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.power(1 + rate, months)
+        payment = np.where(rate == 0, principal / months, principal * rate * growth / (growth - 1))
+    return payment
+
+
+def _number(data: Dict, key: str, default: float = 0.0) -> float:
+    value = data.get(key, default)
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise MortgageInputError(f"{key} must be a number")
+    if not np.isfinite(value) or value < 0:
+        raise MortgageInputError(f"{key} must be a non-negative number")
+    return value
+
+
+def parse_loan(data: Dict) -> Dict[str, float]:
+    """Validate request parameters and resolve the loan amount."""
+    if 'interest_rate' not in data:
+        raise MortgageInputError('interest_rate is required')
+
+    has_loan_amount = 'loan_amount' in data
+    has_home_value_and_downpayment = 'home_value' in data and 'downpayment' in data
+    if not (has_loan_amount or has_home_value_and_downpayment):
+        raise MortgageInputError('Either loan_amount or both home_value and downpayment must be provided.')
+
+    if has_loan_amount:
+        principal = _number(data, 'loan_amount')
+    else:
+        principal = _number(data, 'home_value') - _number(data, 'downpayment')
+        if principal < 0:
+            raise MortgageInputError('downpayment cannot exceed home_value')
+
+    duration_years = _number(data, 'duration_years', DEFAULT_DURATION_YEARS)
+    months = int(round(duration_years * 12))
+    if not 1 <= months <= MAX_MONTHS:
+        raise MortgageInputError(f'duration_years must be between 1 month and {MAX_MONTHS // 12} years')
+
+    return {
+        "principal": principal,
+        "interest_rate": _number(data, 'interest_rate'),
+        "months": months,
+        "monthly_hoa": _number(data, 'monthly_hoa'),
+        "annual_property_tax": _number(data, 'annual_property_tax'),
+        "annual_home_insurance": _number(data, 'annual_home_insurance'),
+    }
+
+
+def calculate_mortgage(data: Dict) -> Dict:
+    """Compute a mortgage quote in the api-ninjas response shape.
+
+    Returns ``monthly_payment``/``annual_payment`` breakdowns (mortgage,
+    property tax, HOA, insurance and total) and ``total_interest_paid``.
+    """
+    loan = parse_loan(data)
+    mortgage = float(monthly_payment(loan["principal"], loan["interest_rate"], loan["months"]))
+
+    monthly_tax = loan["annual_property_tax"] / 12
+    monthly_insurance = loan["annual_home_insurance"] / 12
+    monthly_total = mortgage + monthly_tax + loan["monthly_hoa"] + monthly_insurance
+
+    return {
+        "monthly_payment": {
+            "total": round(monthly_total, 2),
+            "mortgage": round(mortgage, 2),
+            "property_tax": round(monthly_tax, 2),
+            "hoa": round(loan["monthly_hoa"], 2),
+            "annual_home_ins": round(monthly_insurance, 2),
+        },
+        "annual_payment": {
+            "total": round(monthly_total * 12, 2),
+            "mortgage": round(mortgage * 12, 2),
+            "property_tax": round(loan["annual_property_tax"], 2),
+            "hoa": round(loan["monthly_hoa"] * 12, 2),
+            "home_insurance": round(loan["annual_home_insurance"], 2),
+        },
+        "total_interest_paid": round(mortgage * loan["months"] - loan["principal"], 2),
+    }
+
+
+def amortization_schedule(principal: float, annual_rate: float, months: int) -> Dict[str, np.ndarray]:
+    """Full month-by-month schedule, computed in closed form without a Python loop.
+
+    Returns arrays of length ``months``: ``month``, ``payment``,
+    ``interest``, ``principal`` and remaining ``balance``.
+    """
+    rate = annual_rate / 100 / 12
+    payment = float(monthly_payment(principal, annual_rate, months))
+    k = np.arange(months + 1, dtype=np.float64)
+
+    if rate == 0:
+        balance = principal - payment * k
+    else:
+        growth = np.power(1 + rate, k)
+        balance = principal * growth - payment * (growth - 1) / rate
+    balance = np.maximum(balance, 0.0)
+
+    interest = balance[:-1] * rate
+    return {
+        "month": np.arange(1, months + 1),
+        "payment": np.full(months, payment),
+        "interest": interest,
+        "principal": payment - interest,
+        "balance": balance[1:],
+    }
+
+
+def payment_grid(principal: float, rates: Iterable[float], duration_years: Iterable[float]) -> Dict:
+    """Monthly payment and total interest for every (rate, term) combination.
+
+    ``rates`` and ``duration_years`` are broadcast against each other, so
+    the result rows follow ``rates`` and the columns follow
+    ``duration_years``. Rates must be non-negative numbers and terms whole
+    numbers of years up to MAX_MONTHS, at most MAX_GRID_SIZE of each;
+    anything else raises MortgageInputError.
+    """
+    if isinstance(rates, (str, bytes)) or isinstance(duration_years, (str, bytes)):
+        raise MortgageInputError('rates and terms must be lists of numbers')
+    rates = list(rates)
+    duration_years = list(duration_years)
+    if len(rates) > MAX_GRID_SIZE or len(duration_years) > MAX_GRID_SIZE:
+        raise MortgageInputError(f'at most {MAX_GRID_SIZE} rates and {MAX_GRID_SIZE} terms are allowed')
+    rates = [_number({'rates': rate}, 'rates') for rate in rates]
+    terms = [_number({'terms': term}, 'terms') for term in duration_years]
+    if any(not term.is_integer() or not 1 <= term * 12 <= MAX_MONTHS for term in terms):
+        raise MortgageInputError(f'terms must be whole numbers of years from 1 to {MAX_MONTHS // 12}')
+
+    rates = np.asarray(rates, dtype=np.float64)
+    months = np.asarray(terms, dtype=np.float64) * 12
+    payments = monthly_payment(principal, rates[:, None], months[None, :])
+
+    return {
+        "rates": rates.tolist(),
+        "duration_years": (months / 12).tolist(),
+        "monthly_payment": np.round(payments, 2).tolist(),
+        "total_interest_paid": np.round(payments * months[None, :] - principal, 2).tolist(),
+    }
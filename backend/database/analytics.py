@@ -0,0 +1,112 @@
+import json
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+DIGITAL_FLAGS = ['PTS_IB_FLAG', 'APPLE_PAY_FLAG', 'GEORGE_PAY_FLAG', 'GOOGLE_PAY_FLAG', 'WALLET_FLAG', 'GEORGE_INFO_FLAG']
+
+SNAPSHOT_TABLE = "analytics_snapshot"
+
+
+def _client_columns(conn: sqlite3.Connection) -> List[str]:
+    return [row[1] for row in conn.execute("PRAGMA table_info(clients)")]
+
+
+def compute_analytics(conn: sqlite3.Connection) -> Dict[str, Dict]:
+    """Compute every dashboard statistic in a single scan of the clients table.
+
+    All AVG/SUM aggregates are collected into one SELECT, so the cost is one
+    table scan regardless of how many TRX_/MCC_/balance columns exist. The
+    result holds the ``balances``, ``transactions``, ``spending`` and
+    ``digital_engagement`` payloads in the shape the API has always returned.
+    """
+    columns = _client_columns(conn)
+    expressions = ["COUNT(*)"]
+
+    def aggregate(func: str, column: str) -> int:
+        expression = f'{func}("{column}")'
+        if expression not in expressions:
+            expressions.append(expression)
+        return expressions.index(expression)
+
+    # Remember which result slot feeds which output key
+    balances = {}
+    transactions = {'counts': {}, 'amounts': {}}
+    spending = {}
+    digital = {}
+
+    for col in columns:
+        if 'AVG_BALANCE_AMT' in col:
+            balances[col.replace('_AVG_BALANCE_AMT', '')] = aggregate("AVG", col)
+    for col in columns:
+        if 'TRX_' in col and '_CNT' in col:
+            transactions['counts'][col.replace('TRX_', '').replace('_CNT', '')] = aggregate("AVG", col)
+        elif 'TRX_' in col and '_AMT' in col:
+            transactions['amounts'][col.replace('TRX_', '').replace('_AMT', '')] = aggregate("AVG", col)
+    for col in columns:
+        if 'MCC_' in col and '_AMT' in col:
+            spending[col.replace('MCC_', '').replace('_AMT', '')] = aggregate("SUM", col)
+    for flag in DIGITAL_FLAGS:
+        if flag in columns:
+            digital[flag.replace('_FLAG', '')] = aggregate("SUM", flag)
+    ib_logins = aggregate("AVG", "CHNL_IB_LOGINS_CNT") if "CHNL_IB_LOGINS_CNT" in columns else None
+
+    row = conn.execute(f"SELECT {', '.join(expressions)} FROM clients").fetchone()
+    total_clients = row[0]
+
+    def value(slot: int) -> float:
+        return round(row[slot] or 0.0, 2)
+
+    result = {
+        "balances": {key: value(slot) for key, slot in balances.items()},
+        "transactions": {
+            kind: {key: value(slot) for key, slot in slots.items()}
+            for kind, slots in transactions.items()
+        },
+        "spending": {key: value(slot) for key, slot in spending.items()},
+        "digital_engagement": {
+            key: round(((row[slot] or 0) / total_clients) * 100, 2) if total_clients else 0.0
+            for key, slot in digital.items()
+        },
+    }
+    if ib_logins is not None:
+        result["digital_engagement"]['AVG_IB_LOGINS'] = value(ib_logins)
+    return result
+
+
+def write_snapshot(conn: sqlite3.Connection, analytics: Dict[str, Dict]):
+    """Store computed analytics in the analytics_snapshot table, replacing the previous one."""
+    built_at = datetime.now(timezone.utc).isoformat()
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {SNAPSHOT_TABLE} (
+        NAME TEXT PRIMARY KEY,
+        PAYLOAD TEXT,
+        BUILT_AT TEXT
+    )
+    """)
+    conn.execute(f"DELETE FROM {SNAPSHOT_TABLE}")
+    conn.executemany(
+        f"INSERT INTO {SNAPSHOT_TABLE} (NAME, PAYLOAD, BUILT_AT) VALUES (?, ?, ?)",
+        [(name, json.dumps(payload), built_at) for name, payload in analytics.items()]
+    )
+    conn.commit()
+
+
+def build_snapshot(conn: sqlite3.Connection) -> Dict[str, Dict]:
+    """Recompute the analytics and persist them; returns the new snapshot."""
+    analytics = compute_analytics(conn)
+    write_snapshot(conn, analytics)
+    return analytics
+
+
+def read_snapshot(conn: sqlite3.Connection) -> Optional[Dict[str, Dict]]:
+    """Load the stored snapshot, or None if it has not been built yet."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SNAPSHOT_TABLE,)
+    ).fetchone()
+    if not exists:
+        return None
+    rows = conn.execute(f"SELECT NAME, PAYLOAD FROM {SNAPSHOT_TABLE}").fetchall()
+    if not rows:
+        return None
+    return {name: json.loads(payload) for name, payload in rows}
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import sqlite3
+from typing import Dict, List, Optional, Set, Tuple
+
+# SEG_ID in products/offers -> segment column of the clients table
+SEGMENT_BY_ID = {
+    0: "DEM_SEG",
+    1: "FIN_SEG",
+    2: "TRANS_SEG",
+    3: "PROD_SEG",
+    4: "DIG_SEG",
+    5: "REL_SEG",
+}
+
+# Output columns dropped from every record, as the API never exposed them
+HIDDEN_COLUMNS = ("ID", "CLUS_ID")
+
+
+def _cluster_key(value) -> Optional[int]:
+    """Normalise a segment/cluster value (int, float or numeric text) to an int key."""
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else None
+
+
+class CatalogueIndex:
+    """In-memory (segment, cluster) -> records index over one catalogue table.
+
+    The products and offers tables are small and static, so they are read
+    once and every record is prebuilt in its API shape (SEG_ID mapped to the
+    segment name, ID/CLUS_ID hidden) together with its under-18 eligibility
+    (``ELIG == '0'``).
+    """
+
+    def __init__(self, table: str, entries: Dict[Tuple[int, int], List[Tuple[int, str, bool, dict]]],
+                 fingerprint: str = ""):
+        self.table = table
+        # (seg_id, clus_id) -> [(rowid, ID, minor_eligible, record)], in table order
+        self._entries = entries
+        # Digest of the table contents, changes whenever the catalogue does
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection, table: str) -> "CatalogueIndex":
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT rowid, * FROM {table} ORDER BY rowid")
+        columns = [desc[0] for desc in cursor.description][1:]
+
+        entries = {}
+        digest = hashlib.sha1()
+        for row in cursor.fetchall():
+            digest.update(json.dumps(row, default=str).encode())
+            rowid, values = row[0], dict(zip(columns, row[1:]))
+            seg_id = _cluster_key(values.get("SEG_ID"))
+            key = (seg_id, _cluster_key(values.get("CLUS_ID")))
+
+            record = {k: v for k, v in values.items() if k not in HIDDEN_COLUMNS}
+            record["SEG_ID"] = SEGMENT_BY_ID.get(seg_id)
+            minor_eligible = str(values.get("ELIG")) == "0"
+            entries.setdefault(key, []).append((rowid, values.get("ID"), minor_eligible, record))
+        return cls(table, entries, digest.hexdigest())
+
+    def lookup(self, segments: Dict[str, object], minor: bool = False,
+               exclude: Optional[Set[str]] = None) -> List[dict]:
+        """Return the records for a client's segment values, deduplicated by ID.
+
+        ``segments`` maps segment column names (DEM_SEG, ...) to the client's
+        cluster in that segment. Records keep catalogue order and only the
+        first record of each ID is considered; with ``minor`` it is then
+        dropped unless eligible for under-18 clients, and IDs in ``exclude``
+        are dropped as well.
+        """
+        matched = []
+        for seg_id, column in SEGMENT_BY_ID.items():
+            matched.extend(self._entries.get((seg_id, _cluster_key(segments.get(column))), ()))
+
+        matched.sort(key=lambda entry: entry[0])
+        seen = set()
+        records = []
+        for _, record_id, minor_eligible, record in matched:
+            if record_id in seen:
+                continue
+            seen.add(record_id)
+            if minor and not minor_eligible:
+                continue
+            if exclude and record_id in exclude:
+                continue
+            records.append(dict(record))
+        return records
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._entries.values())
@@ -1,24 +1,143 @@
 import os
 import logging
 import sqlite3
-from typing import Dict, List, Optional, Union
-import pandas as pd
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from database.analytics import build_snapshot, compute_analytics, read_snapshot
+from database.catalogue_index import SEGMENT_BY_ID, CatalogueIndex
+from database.columnar_engine import ColumnarEngine
+from database.connection_pool import ConnectionPool
+from database.db import swap_clients, upsert_clients
+from database.query_compiler import ClientQueryCompiler
+from database.recommendations import (catalogue_version, invalidate_recommendations, read_recommendations,
+                                      recommend)
+from instrumentation import count_cache, record_statement, timed
+from recommender.eligibility import EligibilityRules
 
 class ClientDataService:
     """Service to handle operations related to client data from SQLite database."""
 
-    def __init__(self, db_path: str):
+    # Maximum number of distinct filter sets whose row counts are remembered
+    COUNT_CACHE_SIZE = 256
+
+    def __init__(self, db_path: str, pool_size: int = 8, columnar_cache_dir: Optional[str] = None,
+                 eligibility_rules: Optional[EligibilityRules] = None):
         self.db_path = db_path
+        # Statement timings go to the sqlite_statement_seconds histogram
+        self.pool = ConnectionPool(db_path, max_size=pool_size, statement_timer=record_statement)
+        # Optional NumPy engine for ad-hoc aggregates, built lazily on first use
+        # and reloaded whenever the data version changes
+        self.columnar = None
+        if columnar_cache_dir:
+            self.columnar = ColumnarEngine(db_path, columnar_cache_dir, version_func=self.data_version)
+        self._count_cache = {}
+        self._count_cache_version = None  # data version the cached counts were taken at
+        self._columns = None
+        self._query_compiler = None
+        self._write_lock = threading.Lock()
+        self._refresh_listeners = []
+        self._catalogues = {}
+        self._catalogue_lock = threading.Lock()
+        self._analytics = None  # (data version, snapshot)
+        # Compiled catalogue eligibility tags; without them only the under-18 check applies
+        self.eligibility = eligibility_rules
+        self._version_signature = None
+        self._data_version = 0
+        if self.columnar is not None:
+            self.add_refresh_listener(self.columnar.invalidate)
 
     def _connect(self):
-        return sqlite3.connect(self.db_path)
+        """Check out a pooled, read-only connection (use as a context manager)."""
+        return self.pool.connection()
+
+    def data_version(self) -> int:
+        """Version of the client data (PRAGMA user_version, bumped by db.py loads and refreshes).
+
+        The database and WAL files are stat'ed on each call and the pragma is
+        only re-read when they changed, so checking the version does not
+        touch SQLite. Works across processes sharing the database file.
+        """
+        signature = []
+        for suffix in ("", "-wal"):
+            try:
+                stat = os.stat(self.db_path + suffix)
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                signature.append(None)
+        if signature != self._version_signature:
+            with self._connect() as conn:
+                self._data_version = conn.execute("PRAGMA user_version").fetchone()[0]
+            self._version_signature = signature
+        return self._data_version
+
+    def get_pool_stats(self) -> Dict[str, int]:
+        """Return connection pool counters (created, reused, waits, in use...)."""
+        return self.pool.get_stats()
+
+    def close(self):
+        """Close all pooled connections."""
+        self.pool.close()
+
+    def add_refresh_listener(self, callback: Callable[[Optional[List[str]]], None]):
+        """Register ``callback(client_ids)`` to run after client data changes.
+
+        ``client_ids`` lists the changed clients, or is None when the whole
+        table was replaced.
+        """
+        self._refresh_listeners.append(callback)
+
+    def _notify_refresh(self, client_ids: Optional[List[str]]):
+        self._count_cache.clear()
+        self._analytics = None
+        if client_ids is None:
+            # The table was rebuilt, its columns may have changed too
+            self._columns = None
+            self._query_compiler = None
+        for callback in self._refresh_listeners:
+            try:
+                callback(client_ids)
+            except Exception as e:
+                logging.error(f"Refresh listener failed: {str(e)}")
+
+    @timed("ClientDataService.refresh_data")
+    def refresh_data(self, delta_path: Optional[str] = None, full_path: Optional[str] = None,
+                     chunksize: int = 100000) -> Dict:
+        """Apply new client data without rebuilding the database.
+
+        ``delta_path`` is a CSV of new/changed clients upserted by ID;
+        ``full_path`` is a complete export swapped in through a shadow table.
+        Writes go through a dedicated connection (the pool is read-only) and
+        only the caches of the affected clients are invalidated.
+        """
+        if bool(delta_path) == bool(full_path):
+            raise ValueError("Provide exactly one of delta_path or full_path")
+
+        with self._write_lock:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                if delta_path:
+                    changed_ids = upsert_clients(conn, delta_path, chunksize)
+                    result = {"mode": "delta", "updated": len(changed_ids)}
+                else:
+                    changed_ids = None
+                    result = {"mode": "full", "loaded": swap_clients(conn, full_path, chunksize)}
+                build_snapshot(conn)
+                invalidate_recommendations(conn, changed_ids)
+            finally:
+                conn.close()
+
+        self._notify_refresh(changed_ids)
+        return result
 
+    @timed("ClientDataService.client_exists")
     def client_exists(self, client_id: str) -> bool:
         with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT 1 FROM clients WHERE ID = ?", (client_id,))
             return cursor.fetchone() is not None
 
+    @timed("ClientDataService.get_client_data")
     def get_client_data(self, client_id: str) -> Optional[Dict]:
         with self._connect() as conn:
             cursor = conn.cursor()
@@ -32,25 +151,115 @@ class ClientDataService:
     def get_client_by_id(self, client_id: str) -> Optional[Dict]:
         return self.get_client_data(client_id)
 
-    def search_clients(self, query_params: Dict) -> List[Dict]:
-        query = "SELECT * FROM clients WHERE 1=1"
-        params = []
-        for key, value in query_params.items():
-            if isinstance(value, list):
-                placeholders = ','.join('?' for _ in value)
-                query += f" AND {key} IN ({placeholders})"
-                params.extend(value)
-            else:
-                query += f" AND {key} = ?"
-                params.append(value)
+    def get_columns(self) -> List[str]:
+        """Return the column names of the clients table (read once, then cached)."""
+        if self._columns is None:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("PRAGMA table_info(clients)")
+                self._columns = [row[1] for row in cursor.fetchall()]
+        return self._columns
+
+    def _compiler(self) -> ClientQueryCompiler:
+        if self._query_compiler is None:
+            self._query_compiler = ClientQueryCompiler(self.get_columns())
+        return self._query_compiler
+
+    def _build_where(self, query_params: Dict):
+        return self._compiler().compile_where(query_params)
+
+    def _build_select(self, fields: Optional[List[str]]) -> str:
+        # ID is always selected so keyset pagination has a cursor to return
+        return self._compiler().compile_select(fields, required=["ID"])
+
+    def search_clients(self, query_params: Dict, limit: Optional[int] = None,
+                       offset: int = 0, after_id: Optional[str] = None,
+                       fields: Optional[List[str]] = None) -> List[Dict]:
+        """Return one page of matching clients, ordered by ID.
+
+        Filters are validated by ``ClientQueryCompiler`` (see it for the
+        supported operators) and ``fields`` restricts the returned columns.
+        Pagination happens in SQL: ``after_id`` selects keyset pagination
+        (rows with ID greater than the last one seen), otherwise ``offset`` is
+        used. Without a ``limit`` every matching row is returned.
+        """
+        columns, rows = self.search_client_rows(query_params, limit, offset, after_id, fields)
+        return [dict(zip(columns, row)) for row in rows]
+
+    @timed("ClientDataService.search_client_rows")
+    def search_client_rows(self, query_params: Dict, limit: Optional[int] = None,
+                           offset: int = 0, after_id: Optional[str] = None,
+                           fields: Optional[List[str]] = None) -> Tuple[List[str], List[tuple]]:
+        """Like ``search_clients``, but the column names and raw row tuples, with no dict per row."""
+        select = self._build_select(fields)
+        where, params = self._build_where(query_params)
+        if after_id is not None:
+            where += " AND ID > ?"
+            params.append(after_id)
+
+        query = f"SELECT {select} FROM clients {where} ORDER BY ID"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([limit, 0 if after_id is not None else offset])
 
         with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute(query, tuple(params))
             rows = cursor.fetchall()
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return [desc[0] for desc in cursor.description], rows
+
+    @timed("ClientDataService.count_clients")
+    def count_clients(self, query_params: Dict) -> int:
+        """Count matching clients, caching the result per filter set and data version."""
+        key = tuple(sorted((k, tuple(v) if isinstance(v, list) else v)
+                           for k, v in query_params.items()))
+        version = self.data_version()
+        if version != self._count_cache_version:
+            # Changed by a refresh in another worker or a db.py rebuild
+            self._count_cache.clear()
+            self._count_cache_version = version
+        if key in self._count_cache:
+            count_cache("client_count", True)
+            return self._count_cache[key]
+        count_cache("client_count", False)
+
+        where, params = self._build_where(query_params)
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM clients {where}", tuple(params))
+            total = cursor.fetchone()[0]
 
+        if len(self._count_cache) >= self.COUNT_CACHE_SIZE:
+            self._count_cache.clear()
+        self._count_cache[key] = total
+        return total
+
+    def iter_clients(self, query_params: Dict, batch_size: int = 1000,
+                     fields: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Yield matching clients one at a time, fetching ``batch_size`` rows per round trip.
+
+        The query is compiled immediately, so invalid filters raise here rather
+        than on the first iteration.
+        """
+        select = self._build_select(fields)
+        where, params = self._build_where(query_params)
+        query = f"SELECT {select} FROM clients {where} ORDER BY ID"
+
+        def rows():
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, tuple(params))
+                columns = [desc[0] for desc in cursor.description]
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    for row in batch:
+                        yield dict(zip(columns, row))
+
+        return rows()
+
+    @timed("ClientDataService.get_client_segments")
     def get_client_segments(self) -> Dict[str, int]:
         query = "SELECT GPI_CUSTOMER_TYPE_DESC, COUNT(*) FROM clients GROUP BY GPI_CUSTOMER_TYPE_DESC"
         with self._connect() as conn:
@@ -58,70 +267,45 @@ class ClientDataService:
             cursor.execute(query)
             return {row[0]: row[1] for row in cursor.fetchall()}
 
-    def get_average_balances(self) -> Dict[str, float]:
-        query = "PRAGMA table_info(clients)"
-        with self._connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query)
-            columns = [row[1] for row in cursor.fetchall() if 'AVG_BALANCE_AMT' in row[1]]
+    @timed("ClientDataService.get_analytics_snapshot")
+    def get_analytics_snapshot(self) -> Dict[str, Dict]:
+        """Return the materialised dashboard statistics.
 
-            result = {}
-            for col in columns:
-                cursor.execute(f"SELECT AVG({col}) FROM clients")
-                avg = cursor.fetchone()[0] or 0.0
-                result[col.replace('_AVG_BALANCE_AMT', '')] = round(avg, 2)
-            return result
-
-    def get_transaction_statistics(self) -> Dict[str, Dict]:
+        Read from the analytics_snapshot table and kept in memory until the
+        data version changes, whichever process changed it. Databases built
+        before the snapshot existed get it computed on the fly (a single
+        scan) instead.
+        """
+        version = self.data_version()
+        cached = self._analytics
+        if cached is not None and cached[0] == version:
+            return cached[1]
         with self._connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute("PRAGMA table_info(clients)")
-            columns = [row[1] for row in cursor.fetchall()]
-
-            result = {'counts': {}, 'amounts': {}}
+            snapshot = read_snapshot(conn)
+            if snapshot is None:
+                logging.warning("analytics_snapshot missing, computing statistics on the fly")
+                snapshot = compute_analytics(conn)
+        self._analytics = (version, snapshot)
+        return snapshot
 
-            for col in columns:
-                if 'TRX_' in col and '_CNT' in col:
-                    trx_type = col.replace('TRX_', '').replace('_CNT', '')
-                    cursor.execute(f"SELECT AVG({col}) FROM clients")
-                    result['counts'][trx_type] = round(cursor.fetchone()[0] or 0.0, 2)
-                elif 'TRX_' in col and '_AMT' in col:
-                    trx_type = col.replace('TRX_', '').replace('_AMT', '')
-                    cursor.execute(f"SELECT AVG({col}) FROM clients")
-                    result['amounts'][trx_type] = round(cursor.fetchone()[0] or 0.0, 2)
+    def get_average_balances(self) -> Dict[str, float]:
+        return self.get_analytics_snapshot()["balances"]
 
-            return result
+    def get_transaction_statistics(self) -> Dict[str, Dict]:
+        return self.get_analytics_snapshot()["transactions"]
 
     def analyze_spending_patterns(self) -> Dict[str, float]:
-        with self._connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute("PRAGMA table_info(clients)")
-            columns = [row[1] for row in cursor.fetchall() if 'MCC_' in row[1] and '_AMT' in row[1]]
-
-            result = {}
-            for col in columns:
-                cursor.execute(f"SELECT SUM({col}) FROM clients")
-                result[col.replace('MCC_', '').replace('_AMT', '')] = round(cursor.fetchone()[0] or 0.0, 2)
-            return result
+        return self.get_analytics_snapshot()["spending"]
 
     def get_digital_engagement_stats(self) -> Dict[str, Union[float, Dict]]:
-        flags = ['PTS_IB_FLAG', 'APPLE_PAY_FLAG', 'GEORGE_PAY_FLAG', 'GOOGLE_PAY_FLAG', 'WALLET_FLAG', 'GEORGE_INFO_FLAG']
-        result = {}
-
-        with self._connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM clients")
-            total_clients = cursor.fetchone()[0]
+        return self.get_analytics_snapshot()["digital_engagement"]
 
-            for flag in flags:
-                cursor.execute(f"SELECT SUM({flag}) FROM clients")
-                count = cursor.fetchone()[0] or 0
-                result[flag.replace('_FLAG', '')] = round((count / total_clients) * 100, 2)
-
-            cursor.execute("SELECT AVG(CHNL_IB_LOGINS_CNT) FROM clients")
-            result['AVG_IB_LOGINS'] = round(cursor.fetchone()[0] or 0.0, 2)
-
-        return result
+    @timed("ClientDataService.aggregate_clients")
+    def aggregate_clients(self, group_by: List[str], metrics: List[str], filters: Dict) -> Dict:
+        """Run a filtered group-by aggregate on the columnar engine."""
+        if self.columnar is None:
+            raise RuntimeError("Columnar engine is disabled (set COLUMNAR_CACHE_DIR)")
+        return self.columnar.aggregate(group_by, metrics, filters)
 
     def get_sample_client_ids(self, count: int = 10) -> List[str]:
         with self._connect() as conn:
@@ -129,84 +313,100 @@ class ClientDataService:
             cursor.execute("SELECT ID FROM clients LIMIT ?", (count,))
             return [row[0] for row in cursor.fetchall()]
 
-    def get_offers_for_client(self, client_id: str) -> Dict:
-        query = """
-        SELECT DISTINCT * FROM offers
-        WHERE (SEG_ID = 0 AND CLUS_ID = (SELECT DEM_SEG FROM clients WHERE ID = ?))
-        OR (SEG_ID = 1 AND CLUS_ID = (SELECT FIN_SEG FROM clients WHERE ID = ?))
-        OR (SEG_ID = 2 AND CLUS_ID = (SELECT TRANS_SEG FROM clients WHERE ID = ?))
-        OR (SEG_ID = 3 AND CLUS_ID = (SELECT PROD_SEG FROM clients WHERE ID = ?))
-        OR (SEG_ID = 4 AND CLUS_ID = (SELECT DIG_SEG FROM clients WHERE ID = ?))
-        OR (SEG_ID = 5 AND CLUS_ID = (SELECT REL_SEG FROM clients WHERE ID = ?))
-        """
-        age_query = "SELECT GPI_AGE FROM clients WHERE ID = ? LIMIT 1;"
-        
-        mapper = {
-            0: "DEM_SEG",
-            1: "FIN_SEG",
-            2: "TRANS_SEG",
-            3: "PROD_SEG",
-            4: "DIG_SEG",
-            5: "REL_SEG",
-        }
-
+    def _get_catalogue(self, table: str) -> CatalogueIndex:
+        index = self._catalogues.get(table)
+        if index is None:
+            with self._catalogue_lock:
+                index = self._catalogues.get(table)
+                if index is None:
+                    with self._connect() as conn:
+                        index = CatalogueIndex.load(conn, table)
+                    self._catalogues[table] = index
+        return index
+
+    def load_catalogue(self):
+        """(Re)build the in-memory products/offers indexes from the database."""
+        with self._connect() as conn:
+            catalogues = {table: CatalogueIndex.load(conn, table) for table in ("products", "offers")}
+        with self._catalogue_lock:
+            self._catalogues = catalogues
+
+    def recommendation_version(self) -> str:
+        """Version stamp precomputed recommendations must carry to be served."""
+        return catalogue_version(self._get_catalogue("products"), self._get_catalogue("offers"), self.eligibility)
+
+    def _get_client_segments(self, client_id: str) -> Optional[Dict]:
+        columns = ["GPI_AGE", *SEGMENT_BY_ID.values()]
+        if self.eligibility is not None:
+            available = set(self.get_columns())
+            columns += [c for c in self.eligibility.columns if c in available and c not in columns]
+        query = f"SELECT {', '.join(columns)} FROM clients WHERE ID = ?"
         with self._connect() as conn:
             cursor = conn.cursor()
-            cursor.execute(age_query, (client_id,))
-            result = cursor.fetchone()
-            age = result[0] if result else None
-
-            df = pd.read_sql_query(query, conn, params=(client_id,) * 6)
-            df = df.drop_duplicates(subset=["ID"])
-
-            if age is not None and age < 18:
-                df = df[df['ELIG'].astype(str) == '0']
-                
-            df['SEG_ID'] = df['SEG_ID'].map(mapper)
-
-            df = df.drop(columns=["ID", "CLUS_ID"], errors="ignore")
-            return {
-                "client_id": client_id,
-                "offers": df.to_dict(orient="records")
-            }
-
-    def get_products_for_client(self, client_id: str) -> Dict:
-        query = """
-        SELECT DISTINCT * FROM products
-        WHERE (SEG_ID = 0 AND CLUS_ID = (SELECT DEM_SEG FROM clients WHERE ID = ?))
-        OR (SEG_ID = 1 AND CLUS_ID = (SELECT FIN_SEG FROM clients WHERE ID = ?))
-        OR (SEG_ID = 2 AND CLUS_ID = (SELECT TRANS_SEG FROM clients WHERE ID = ?))
-        OR (SEG_ID = 3 AND CLUS_ID = (SELECT PROD_SEG FROM clients WHERE ID = ?))
-        OR (SEG_ID = 4 AND CLUS_ID = (SELECT DIG_SEG FROM clients WHERE ID = ?))
-        OR (SEG_ID = 5 AND CLUS_ID = (SELECT REL_SEG FROM clients WHERE ID = ?))
+            cursor.execute(query, (client_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            columns = [desc[0] for desc in cursor.description]
+            return dict(zip(columns, row))
+
+    @timed("ClientDataService.recommend")
+    def _recommend(self, client_id: str, table: str, client: Optional[Dict] = None) -> List[Dict]:
+        """Products or offers of a client; ``client`` is its row if the caller already has it."""
+        # Rows written by the precompute job (database/recommendations.py) first
+        with self._connect() as conn:
+            records = read_recommendations(conn, client_id, table, self.recommendation_version())
+        count_cache("precomputed_recommendations", records is not None)
+        if records is not None:
+            return records
+
+        segments = client if client is not None else self._get_client_segments(client_id)
+        if segments is None:
+            return []
+        exclude = self.eligibility.ineligible_ids(segments) if self.eligibility is not None else None
+        return recommend(self._get_catalogue(table), segments, exclude)
+
+    @timed("ClientDataService.check_eligibility")
+    def check_eligibility(self, client_id: str) -> Optional[Dict[str, Dict]]:
+        """Per-product eligibility of one client, with the failed/unverified tags."""
+        if self.eligibility is None:
+            raise RuntimeError("No eligibility rules loaded")
+        segments = self._get_client_segments(client_id)
+        if segments is None:
+            return None
+        return self.eligibility.check_client(segments)
+
+    @timed("ClientDataService.score_eligibility")
+    def score_eligibility(self, filters: Dict) -> Dict:
+        """Count eligible clients per product over every client matching ``filters``.
+
+        Runs on the columnar engine, so the whole client base is scored with
+        one vectorised pass.
         """
-        age_query = "SELECT GPI_AGE FROM clients WHERE ID = ? LIMIT 1;"
-        
-        mapper = {
-            0: "DEM_SEG",
-            1: "FIN_SEG",
-            2: "TRANS_SEG",
-            3: "PROD_SEG",
-            4: "DIG_SEG",
-            5: "REL_SEG",
+        if self.eligibility is None:
+            raise RuntimeError("No eligibility rules loaded")
+        if self.columnar is None:
+            raise RuntimeError("Columnar engine is disabled (set COLUMNAR_CACHE_DIR)")
+        columns, rows = self.columnar.select_columns(self.eligibility.columns, filters)
+        eligible, unknown = self.eligibility.evaluate(columns)
+        eligible_counts = eligible.sum(axis=0)
+        unknown_counts = unknown.sum(axis=0)
+        return {
+            "clients": rows,
+            "products": {
+                product_id: {"eligible": int(eligible_counts[i]), "unverified": int(unknown_counts[i])}
+                for i, product_id in enumerate(self.eligibility.product_ids)
+            },
         }
 
-        with self._connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute(age_query, (client_id,))
-            result = cursor.fetchone()
-            age = result[0] if result else None
-
-            df = pd.read_sql_query(query, conn, params=(client_id,) * 6)
-            df = df.drop_duplicates(subset=["ID"])
-            
-            if age is not None and age < 18:
-                df = df[df['ELIG'].astype(str) == '0']
-
-            df['SEG_ID'] = df['SEG_ID'].map(mapper)
-
-            df = df.drop(columns=["ID", "CLUS_ID"], errors="ignore")
-            return {
-                "client_id": client_id,
-                "products": df.to_dict(orient="records")
-            }
+    def get_offers_for_client(self, client_id: str, client: Optional[Dict] = None) -> Dict:
+        return {
+            "client_id": client_id,
+            "offers": self._recommend(client_id, "offers", client)
+        }
+
+    def get_products_for_client(self, client_id: str, client: Optional[Dict] = None) -> Dict:
+        return {
+            "client_id": client_id,
+            "products": self._recommend(client_id, "products", client)
+        }
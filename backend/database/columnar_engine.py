@@ -0,0 +1,387 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are not serialised across processes
+    fcntl = None
+
+# Rows fetched per round trip while building the column files
+BUILD_BATCH_SIZE = 50000
+
+AGGREGATES = ("count", "sum", "avg", "min", "max")
+
+FILTER_OPERATORS = ("eq", "ne", "gt", "gte", "lt", "lte", "in", "between")
+
+
+class AggregateError(ValueError):
+    """Raised for unknown columns, aggregates or filter operators."""
+
+
+class _ColumnSet:
+    """One loaded generation of column arrays, immutable once built."""
+
+    def __init__(self, columns: Dict[str, np.ndarray], categories: Dict[str, List[str]], rows: int, version):
+        self.columns = columns
+        self.categories = categories
+        self.rows = rows
+        self.version = version
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self.columns:
+            raise AggregateError(f"Unknown column: {name}")
+        return self.columns[name]
+
+    def encode(self, name: str, value):
+        """Convert a filter value to the column's representation (code or float)."""
+        if name in self.categories:
+            try:
+                return self.categories[name].index(str(value))
+            except ValueError:
+                return -2  # matches nothing
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise AggregateError(f"{name} expects a numeric value, got {value!r}")
+
+    def filter_mask(self, filters: Dict) -> Optional[np.ndarray]:
+        mask = None
+        for key, value in filters.items():
+            name, _, op = key.partition("__")
+            op = op or ("in" if isinstance(value, (list, tuple)) else "eq")
+            if op not in FILTER_OPERATORS:
+                raise AggregateError(f"Unknown operator '{op}' in {key}")
+
+            data = self.column(name)
+            is_text = name in self.categories
+            if op in ("in", "between"):
+                values = value if isinstance(value, (list, tuple)) else [v.strip() for v in str(value).split(",")]
+                values = [self.encode(name, v) for v in values]
+            else:
+                values = [self.encode(name, value)]
+
+            if is_text and op not in ("eq", "ne", "in"):
+                raise AggregateError(f"Operator '{op}' is not supported on text column {name}")
+
+            if op == "eq":
+                condition = data == values[0]
+            elif op == "ne":
+                # Like SQL, NULL is neither equal nor unequal to anything
+                condition = (data != values[0]) & ((data != -1) if is_text else ~np.isnan(data))
+            elif op == "gt":
+                condition = data > values[0]
+            elif op == "gte":
+                condition = data >= values[0]
+            elif op == "lt":
+                condition = data < values[0]
+            elif op == "lte":
+                condition = data <= values[0]
+            elif op == "in":
+                condition = np.isin(data, values)
+            else:
+                if len(values) != 2:
+                    raise AggregateError(f"{key} needs exactly two values: low,high")
+                condition = (data >= values[0]) & (data <= values[1])
+
+            mask = condition if mask is None else (mask & condition)
+        return mask
+
+
+class ColumnarEngine:
+    """Columnar, memory-mapped copy of the clients table for ad-hoc aggregates.
+
+    The table is converted once into one ``.npy`` file per column, in a
+    generation directory under ``cache_dir`` named by ``meta.json``:
+    numeric columns as float64 (NULL -> NaN), text columns
+    dictionary-encoded as int32 codes (-1 for NULL) plus a category list.
+    The files are memory-mapped, so the OS shares them across workers and
+    only touched pages are read. Filtered group-by aggregates then run as
+    vectorised NumPy kernels instead of SQL scans.
+
+    The cache is tagged with the source version: ``version_func()`` (the
+    service's data version) or else the database file's size and mtime. It
+    is compared on every query, so a refresh done by any process, or a
+    rebuild by db.py, reloads the columns; ``invalidate`` drops them at once.
+    """
+
+    def __init__(self, db_path: str, cache_dir: str, version_func: Optional[Callable[[], int]] = None):
+        self.db_path = db_path
+        self.cache_dir = cache_dir
+        self.version_func = version_func
+        self._lock = threading.Lock()
+        self._state = None  # current _ColumnSet, replaced wholesale on reload
+
+    # -- cache management -------------------------------------------------
+
+    def _source_version(self):
+        if self.version_func is not None:
+            return self.version_func()
+        version = []
+        for suffix in ("", "-wal"):
+            try:
+                stat = os.stat(self.db_path + suffix)
+                version.append([stat.st_size, stat.st_mtime_ns])
+            except FileNotFoundError:
+                version.append(None)
+        return version
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.cache_dir, "meta.json")
+
+    def _column_path(self, generation: str, index: int) -> str:
+        return os.path.join(self.cache_dir, generation, f"col_{index}.npy")
+
+    def _read_meta(self) -> Optional[Dict]:
+        try:
+            with open(self._meta_path()) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @contextmanager
+    def _build_lock(self):
+        """Exclusive lock across processes, so workers don't build the same generation twice."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, "build.lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _build(self, version):
+        """Write a new generation directory of column files and point meta.json at it.
+
+        Columns are filled in place through ``open_memmap``, so a build
+        needs one batch of rows in memory, not the whole table.
+        """
+        started = time.perf_counter()
+        generation_dir = tempfile.mkdtemp(prefix="gen-", dir=self.cache_dir)
+        generation = os.path.basename(generation_dir)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("BEGIN")  # the row count and the rows come from one snapshot
+            table_info = conn.execute("PRAGMA table_info(clients)").fetchall()
+            names = [row[1] for row in table_info]
+            declared = [(row[2] or "").upper() for row in table_info]
+            rows = conn.execute("SELECT COUNT(*) FROM clients").fetchone()[0]
+
+            numeric = [("INT" in t or "REAL" in t or "FLOA" in t or "DOUB" in t or "NUM" in t) for t in declared]
+            arrays = []
+            for i, is_num in enumerate(numeric):
+                array = np.lib.format.open_memmap(self._column_path(generation, i), mode="w+",
+                                                  dtype=np.float64 if is_num else np.int32, shape=(rows,))
+                array[:] = np.nan if is_num else -1
+                arrays.append(array)
+            lookups = [None if is_num else {} for is_num in numeric]
+
+            quoted = ", ".join(f'"{name}"' for name in names)
+            cursor = conn.execute(f"SELECT {quoted} FROM clients")
+            offset = 0
+            while True:
+                batch = cursor.fetchmany(BUILD_BATCH_SIZE)
+                if not batch:
+                    break
+                end = offset + len(batch)
+                for i, values in enumerate(zip(*batch)):
+                    if numeric[i]:
+                        arrays[i][offset:end] = [np.nan if v is None else v for v in values]
+                    else:
+                        lookup = lookups[i]
+                        arrays[i][offset:end] = [
+                            -1 if v is None else lookup.setdefault(str(v), len(lookup)) for v in values
+                        ]
+                offset = end
+            for array in arrays:
+                array.flush()
+        except Exception:
+            shutil.rmtree(generation_dir, ignore_errors=True)
+            raise
+        finally:
+            conn.close()
+        del arrays
+
+        meta = {
+            "version": version,
+            "generation": generation,
+            "rows": rows,
+            "columns": [
+                {"name": name, "numeric": numeric[i],
+                 "categories": None if numeric[i] else list(lookups[i].keys())}
+                for i, name in enumerate(names)
+            ],
+        }
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+        with os.fdopen(fd, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path())
+
+        # Older generations are unlinked, never overwritten: queries and other
+        # workers that still map them keep reading the old files until they reload.
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith("gen-") and name != generation:
+                shutil.rmtree(path, ignore_errors=True)
+            elif name.startswith("col_") and name.endswith(".npy"):  # pre-generation layout
+                os.remove(path)
+
+        logging.info(f"Columnar cache built: {rows} rows x {len(names)} columns "
+                     f"in {time.perf_counter() - started:.2f}s")
+        return meta
+
+    def _load(self, version):
+        meta = self._read_meta()
+        if meta is None or meta.get("version") != version or "generation" not in meta:
+            with self._build_lock():
+                # Another worker may have built this version while we waited
+                meta = self._read_meta()
+                if meta is None or meta.get("version") != version or "generation" not in meta:
+                    meta = self._build(version)
+
+        columns, categories = {}, {}
+        for i, column in enumerate(meta["columns"]):
+            columns[column["name"]] = np.load(self._column_path(meta["generation"], i), mmap_mode="r")
+            if not column["numeric"]:
+                categories[column["name"]] = column["categories"]
+        return _ColumnSet(columns, categories, meta["rows"], version)
+
+    def _ensure_loaded(self) -> _ColumnSet:
+        version = self._source_version()
+        state = self._state
+        if state is None or state.version != version:
+            with self._lock:
+                state = self._state
+                if state is None or state.version != version:
+                    state = self._state = self._load(version)
+        return state
+
+    def invalidate(self, *_):
+        """Forget the loaded columns; the next query rebuilds them if the database changed."""
+        with self._lock:
+            self._state = None
+
+    # -- query ------------------------------------------------------------
+
+    def select_columns(self, names: List[str], filters: Optional[Dict] = None) -> Tuple[Dict[str, np.ndarray], int]:
+        """Numeric columns for the rows matching ``filters``.
+
+        Returns ``({name: float64 array}, rows)``; names that are missing or
+        text columns are left out, so callers can treat them as unknown.
+        """
+        cs = self._ensure_loaded()
+        mask = cs.filter_mask(filters or {})
+        columns = {}
+        for name in names:
+            if name in cs.columns and name not in cs.categories:
+                column = cs.columns[name]
+                columns[name] = column if mask is None else column[mask]
+        return columns, int(cs.rows if mask is None else mask.sum())
+
+    @staticmethod
+    def _parse_metric(metric: str) -> Tuple[str, Optional[str]]:
+        func, _, column = metric.partition(":")
+        func = func.strip().lower()
+        if func not in AGGREGATES:
+            raise AggregateError(f"Unknown aggregate: {func}")
+        if func != "count" and not column:
+            raise AggregateError(f"{func} needs a column, e.g. {func}:CEC_TOTAL_BALANCE_AMT")
+        return func, column or None
+
+    def aggregate(self, group_by: List[str], metrics: List[str], filters: Optional[Dict] = None) -> Dict:
+        """Run a filtered group-by.
+
+        ``group_by`` is a list of column names (may be empty for a grand
+        total), ``metrics`` are ``count`` or ``<func>:<column>`` with func in
+        sum/avg/min/max, ``filters`` uses the ``COLUMN__op`` syntax of the
+        client search. NULLs are ignored by sum/avg/min/max, as in SQL.
+        """
+        started = time.perf_counter()
+        cs = self._ensure_loaded()
+        parsed = [self._parse_metric(metric) for metric in (metrics or ["count"])]
+        for _, column in parsed:
+            if column is not None:
+                if column in cs.categories:
+                    raise AggregateError(f"Cannot aggregate text column {column}")
+                cs.column(column)
+        group_columns = [cs.column(name) for name in group_by]
+
+        mask = cs.filter_mask(filters or {})
+        selected = np.arange(cs.rows) if mask is None else np.flatnonzero(mask)
+
+        # Map each selected row to a dense group number. NaN never equals NaN in
+        # np.unique, so every column becomes a (is NULL, value or 0) key pair and
+        # all NULLs of a column fall into one group, sorted after the values.
+        if group_by:
+            key_columns = []
+            for column in group_columns:
+                values = np.asarray(column[selected], dtype=np.float64)
+                nulls = np.isnan(values)
+                key_columns += [nulls.astype(np.float64), np.where(nulls, 0.0, values)]
+            keys = np.stack(key_columns, axis=1)
+            unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+        else:
+            unique_keys, inverse = np.zeros((1, 0)), np.zeros(len(selected), dtype=np.intp)
+        group_count = len(unique_keys)
+
+        results = {}
+        for func, column in parsed:
+            label = func if column is None else f"{func}_{column}"
+            if func == "count":
+                results[label] = np.bincount(inverse, minlength=group_count).astype(float)
+                continue
+
+            values = np.asarray(cs.columns[column][selected], dtype=np.float64)
+            valid = ~np.isnan(values)
+            valid_counts = np.bincount(inverse, weights=valid, minlength=group_count)
+            if func in ("sum", "avg"):
+                sums = np.bincount(inverse, weights=np.where(valid, values, 0.0), minlength=group_count)
+                if func == "sum":
+                    results[label] = sums
+                else:
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        results[label] = np.where(valid_counts > 0, sums / valid_counts, np.nan)
+            else:
+                fill = np.inf if func == "min" else -np.inf
+                reducer = np.minimum if func == "min" else np.maximum
+                out = np.full(group_count, fill)
+                reducer.at(out, inverse[valid], values[valid])
+                out[valid_counts == 0] = np.nan
+                results[label] = out
+
+        groups = []
+        for g in range(group_count):
+            group = {}
+            for j, name in enumerate(group_by):
+                is_null, key = unique_keys[g][2 * j], unique_keys[g][2 * j + 1]
+                if is_null:
+                    group[name] = None
+                elif name in cs.categories:
+                    code = int(key)
+                    group[name] = cs.categories[name][code] if code >= 0 else None
+                else:
+                    group[name] = int(key) if float(key).is_integer() else float(key)
+            for label, values in results.items():
+                value = values[g]
+                group[label] = None if np.isnan(value) else (int(value) if label == "count" else round(float(value), 4))
+            groups.append(group)
+
+        return {
+            "groups": groups,
+            "rows_matched": int(len(selected)),
+            "rows_total": int(cs.rows),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
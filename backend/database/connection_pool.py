@@ -0,0 +1,267 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor reporting each statement's time to its connection's timer.
+
+    SQLite produces rows lazily, so most of a large query's cost is in the
+    fetch calls. A statement's execute and fetch times are added up and
+    reported once: when its rows run out, the cursor runs the next
+    statement, or it is closed or garbage-collected.
+    """
+
+    _statement = None
+    _elapsed = 0.0
+
+    def _record(self):
+        sql, self._statement = self._statement, None
+        if sql is not None:
+            self.connection.statement_timer(sql, self._elapsed)
+
+    def execute(self, sql, parameters=()):
+        self._record()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._statement = sql
+            self._elapsed = time.perf_counter() - started
+
+    def executemany(self, sql, seq_of_parameters):
+        self._record()
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection.statement_timer(sql, time.perf_counter() - started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = None
+        try:
+            row = super().fetchone()
+            return row
+        finally:
+            self._elapsed += time.perf_counter() - started
+            if row is None:
+                self._record()
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = []
+        try:
+            rows = super().fetchmany(size)
+            return rows
+        finally:
+            self._elapsed += time.perf_counter() - started
+            if len(rows) < size:
+                self._record()
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._elapsed += time.perf_counter() - started
+            self._record()
+
+    def close(self):
+        self._record()
+        super().close()
+
+    def __del__(self):
+        # A statement whose rows were not all fetched, e.g. a single fetchone()
+        try:
+            self._record()
+        except Exception:
+            pass
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors time their statements; ``statement_timer(sql, seconds)`` is set by the pool."""
+
+    statement_timer = staticmethod(lambda sql, seconds: None)
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    """Thread-safe pool of reusable SQLite connections.
+
+    Connections are checked out for the duration of a ``with`` block and
+    returned afterwards, so Flask workers reuse an already-open file handle,
+    parsed schema and warm page cache instead of reconnecting per request.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_size: int = 8,
+        timeout: float = 10.0,
+        read_only: bool = True,
+        mmap_size: int = 256 * 1024 * 1024,
+        cache_size_kib: int = 64 * 1024,
+        cached_statements: int = 256,
+        statement_timer: Optional[Callable[[str, float], None]] = None,
+    ):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.read_only = read_only
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self.cached_statements = cached_statements
+        # Called with (sql, seconds) for every statement run on a pooled connection
+        self.statement_timer = statement_timer
+
+        self._idle = queue.LifoQueue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            "created": 0,
+            "checkouts": 0,
+            "reused": 0,
+            "waits": 0,
+            "discarded": 0,
+        }
+
+    def _create_connection(self) -> sqlite3.Connection:
+        # cached_statements keeps the prepared statements of the hot queries
+        # alive on the connection, so reusing a connection also reuses them.
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=TimedConnection if self.statement_timer is not None else sqlite3.Connection,
+        )
+        if self.statement_timer is not None:
+            conn.statement_timer = self.statement_timer
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError as e:
+            logging.warning(f"Could not enable WAL on {self.db_path}: {str(e)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        # Negative cache_size is expressed in KiB rather than pages
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        if self.read_only:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self._stats["checkouts"] += 1
+                self._stats["reused"] += 1
+            return conn
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._size < self.max_size
+            if can_create:
+                self._size += 1
+
+        if can_create:
+            try:
+                conn = self._create_connection()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+            with self._lock:
+                self._stats["created"] += 1
+                self._stats["checkouts"] += 1
+            return conn
+
+        # Pool exhausted: wait for another thread to return a connection
+        with self._lock:
+            self._stats["waits"] += 1
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Timed out waiting for a connection to {self.db_path}")
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["reused"] += 1
+        return conn
+
+    def _release(self, conn: sqlite3.Connection, broken: bool = False):
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                broken = True
+
+        if broken or self._closed:
+            self._discard(conn)
+            return
+
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._discard(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self._size -= 1
+                self._stats["discarded"] += 1
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection for the duration of the ``with`` block."""
+        conn = self._acquire()
+        broken = False
+        try:
+            yield conn
+        except (sqlite3.InternalError, sqlite3.DatabaseError) as e:
+            # Bad SQL or constraint errors leave the connection usable; a bare
+            # DatabaseError (corrupt or replaced file) means it should not go
+            # back into the pool.
+            broken = type(e) in (sqlite3.DatabaseError, sqlite3.InternalError)
+            raise
+        finally:
+            self._release(conn, broken=broken)
+
+    def close(self):
+        """Close every idle connection and refuse further checkouts."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return a snapshot of the pool counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+        stats["idle"] = self._idle.qsize()
+        stats["in_use"] = stats["size"] - stats["idle"]
+        stats["max_size"] = self.max_size
+        return stats
@@ -1,46 +1,357 @@
-import pandas as pd
+import argparse
+import logging
 import sqlite3
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+try:
+    from database.analytics import build_snapshot
+    from database.recommendations import RECOMMENDATIONS_TABLE
+except ImportError:  # run as a script from backend/database
+    from analytics import build_snapshot
+    from recommendations import RECOMMENDATIONS_TABLE
+
+# Segment columns of the clients table; each maps to SEG_ID 0..5 in products/offers
+SEGMENT_COLUMNS = ["DEM_SEG", "FIN_SEG", "TRANS_SEG", "PROD_SEG", "DIG_SEG", "REL_SEG"]
+
+PRODUCT_COLUMNS = ['ID', 'SEG_ID', 'CLUS_ID', 'PROD', 'ELIG', 'DESCR']
+OFFER_COLUMNS = ['ID', 'SEG_ID', 'CLUS_ID', 'PROD', 'ELIG', 'DESCR', 'LINK']
+
+# Rows sampled from the clients CSV to infer the table schema and column dtypes
+DTYPE_SAMPLE_ROWS = 10000
+
+# String columns with at most this share of distinct values are read as categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _catalogue_frame(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Rename catalogue columns positionally, padding any missing trailing ones."""
+    df = df.iloc[:, :len(columns)].copy()
+    df.columns = columns[:df.shape[1]]
+    for column in columns[df.shape[1]:]:
+        df[column] = None
+    return df
+
+
+def load_clients(conn: sqlite3.Connection, df_clients: pd.DataFrame):
+    """(Re)create the clients table with ID as its primary key."""
+    duplicates = df_clients["ID"].duplicated()
+    if duplicates.any():
+        logging.warning(f"Dropping {int(duplicates.sum())} duplicate client IDs")
+        df_clients = df_clients[~duplicates]
+
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS clients")
+    cursor.execute(pd.io.sql.get_schema(df_clients, "clients", keys="ID", con=conn))
+    df_clients.to_sql("clients", conn, if_exists="append", index=False)
+
+
+def infer_client_dtypes(sample: pd.DataFrame, compact_floats: bool = False) -> Dict[str, str]:
+    """Pick compact pandas dtypes for the clients CSV from a sample of its rows.
+
+    Integer columns are read as nullable integers and downcast per chunk to
+    the smallest width that fits (0/1 flags end up as int8), so a wider value
+    or a gap further down the file cannot break the load. Low-cardinality
+    strings become categoricals. Amounts stay float64 unless
+    ``compact_floats`` is set: float32 keeps only ~7 significant digits and
+    would round the values written to the database.
+    """
+    dtypes = {}
+    for column in sample.columns:
+        series = sample[column]
+        if column == "ID":
+            dtypes[column] = "str"
+        elif pd.api.types.is_integer_dtype(series):
+            dtypes[column] = "Int64"
+        elif pd.api.types.is_float_dtype(series):
+            if compact_floats:
+                dtypes[column] = "float32"
+        elif series.nunique() <= max(1, len(series) * CATEGORY_MAX_RATIO):
+            dtypes[column] = "category"
+    return dtypes
+
+
+def _iter_csv_chunks(csv_path: str, chunksize: int, compact_floats: bool = False):
+    """Yield ``(columns, rows)`` for each chunk of a clients-shaped CSV.
+
+    Rows are a list of tuples of Python scalars with ``None`` for missing
+    values, ready for ``executemany``.
+    """
+    sample = pd.read_csv(csv_path, nrows=DTYPE_SAMPLE_ROWS)
+    dtypes = infer_client_dtypes(sample, compact_floats)
+    columns = list(sample.columns)
+
+    for chunk in pd.read_csv(csv_path, dtype=dtypes, chunksize=chunksize):
+        for column, dtype in dtypes.items():
+            if dtype == "Int64":
+                chunk[column] = pd.to_numeric(chunk[column], downcast="integer")
+        values = chunk[columns].astype(object).where(chunk[columns].notna(), None)
+        yield columns, list(values.itertuples(index=False, name=None))
+
+
+def load_clients_chunked(conn: sqlite3.Connection, clients_csv: str, chunksize: int,
+                         compact_floats: bool = False, table: str = "clients") -> int:
+    """Stream the clients CSV into ``table`` in batches of ``chunksize`` rows.
+
+    The schema comes from a sample of the file, every chunk is written with
+    ``executemany`` and the whole reload runs in a single transaction, so
+    peak memory is bounded by the chunk size rather than the file size.
+    Duplicate IDs keep their first occurrence. Returns the number of rows
+    inserted.
+    """
+    sample = pd.read_csv(clients_csv, nrows=DTYPE_SAMPLE_ROWS)
+
+    cursor = conn.cursor()
+    rows_read = 0
+    changes_before = conn.total_changes
+    cursor.execute("BEGIN")
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(pd.io.sql.get_schema(sample, table, keys="ID", con=conn))
+
+        for columns, rows in _iter_csv_chunks(clients_csv, chunksize, compact_floats):
+            quoted = ", ".join(f'"{column}"' for column in columns)
+            placeholders = ", ".join("?" for _ in columns)
+            cursor.executemany(f"INSERT OR IGNORE INTO {table} ({quoted}) VALUES ({placeholders})", rows)
+            rows_read += len(rows)
+            logging.info(f"Loaded {rows_read} client rows")
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    inserted = conn.total_changes - changes_before
+    if inserted < rows_read:
+        logging.warning(f"Dropped {rows_read - inserted} duplicate client IDs")
+    return inserted
+
+
+def bump_data_version(conn: sqlite3.Connection) -> int:
+    """Advance the data version (PRAGMA user_version) that HTTP caching keys on.
+
+    The version is a Unix timestamp and always moves forward, so a rebuilt
+    database never reuses a version handed out for an older one.
+    """
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    version = max(current + 1, int(time.time()))
+    conn.execute(f"PRAGMA user_version = {version}")
+    return version
+
+
+def upsert_clients(conn: sqlite3.Connection, delta_csv: str, chunksize: int = 100000) -> List[str]:
+    """Insert or update the clients listed in ``delta_csv``, matched by ID.
+
+    The delta may carry any subset of the clients columns as long as ID is
+    present; only those columns are updated. Everything is applied in one
+    write transaction, so readers (WAL mode) keep seeing the previous data
+    until it commits. Returns the IDs that were written.
+    """
+    cursor = conn.cursor()
+    table_info = cursor.execute("PRAGMA table_info(clients)").fetchall()
+    existing = [row[1] for row in table_info]
+    # ID alone as primary key (an INTEGER PRIMARY KEY has no index, it is the rowid), or a unique index on ID
+    has_unique_id = [row[1] for row in table_info if row[5]] == ["ID"] or any(
+        row[2] and [info[2] for info in cursor.execute(f'PRAGMA index_info("{row[1]}")')] == ["ID"]
+        for row in cursor.execute("PRAGMA index_list(clients)").fetchall()
+    )
+    if not has_unique_id:
+        raise RuntimeError("clients.ID has no unique index; rebuild the database with db.py first")
+
+    changed_ids = []
+    cursor.execute("BEGIN")
+    try:
+        for columns, rows in _iter_csv_chunks(delta_csv, chunksize):
+            unknown = [column for column in columns if column not in existing]
+            if unknown:
+                raise ValueError(f"Delta has columns not in clients: {', '.join(unknown)}")
+            if "ID" not in columns:
+                raise ValueError("Delta file must contain an ID column")
+
+            quoted = ", ".join(f'"{column}"' for column in columns)
+            placeholders = ", ".join("?" for _ in columns)
+            updates = ", ".join(f'"{column}" = excluded."{column}"' for column in columns if column != "ID")
+            conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+
+            cursor.executemany(
+                f"INSERT INTO clients ({quoted}) VALUES ({placeholders}) ON CONFLICT(ID) {conflict}",
+                rows
+            )
+            id_index = columns.index("ID")
+            changed_ids.extend(str(row[id_index]) for row in rows)
+
+        bump_data_version(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    logging.info(f"Upserted {len(changed_ids)} clients from {delta_csv}")
+    return changed_ids
+
+
+def swap_clients(conn: sqlite3.Connection, clients_csv: str, chunksize: int = 100000) -> int:
+    """Replace the clients table with a full export via a shadow table.
+
+    The new data is loaded and indexed as ``clients_shadow`` while readers
+    keep using ``clients``; only the drop and rename then happen in one
+    short transaction, which also drops the precomputed recommendations of
+    the old clients. Returns the number of rows loaded.
+    """
+    loaded = load_clients_chunked(conn, clients_csv, chunksize, table="clients_shadow")
+    create_client_indexes(conn, "clients_shadow")
+    conn.commit()
+
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    try:
+        cursor.execute("DROP TABLE clients")
+        cursor.execute("ALTER TABLE clients_shadow RENAME TO clients")
+        cursor.execute(f"DROP TABLE IF EXISTS {RECOMMENDATIONS_TABLE}")
+        bump_data_version(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    conn.execute("ANALYZE clients")
+    conn.commit()
+    logging.info(f"Swapped in {loaded} clients from {clients_csv}")
+    return loaded
+
+
+def load_catalogue(conn: sqlite3.Connection, df_all_offers: pd.DataFrame):
+    """(Re)create the products and offers tables from the cluster offers CSV."""
+    df_products = _catalogue_frame(df_all_offers[df_all_offers.iloc[:, 0].str.startswith("P")], PRODUCT_COLUMNS)
+    df_offers = _catalogue_frame(df_all_offers[df_all_offers.iloc[:, 0].str.startswith("O")], OFFER_COLUMNS)
+
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS products")
+    cursor.execute("""
+    CREATE TABLE products (
+        ID TEXT,
+        SEG_ID INTEGER,
+        CLUS_ID INTEGER,
+        PROD TEXT,
+        ELIG TEXT,
+        DESCR TEXT
+    )
+    """)
+    df_products.to_sql("products", conn, if_exists="append", index=False)
+
+    cursor.execute("DROP TABLE IF EXISTS offers")
+    cursor.execute("""
+    CREATE TABLE offers (
+        ID TEXT,
+        SEG_ID INTEGER,
+        CLUS_ID INTEGER,
+        PROD TEXT,
+        ELIG TEXT,
+        DESCR TEXT,
+        LINK TEXT
+    )
+    """)
+    df_offers.to_sql("offers", conn, if_exists="append", index=False)
+
+
+def create_indexes(conn: sqlite3.Connection):
+    """Create the secondary indexes used by the lookup paths."""
+    cursor = conn.cursor()
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_seg_clus ON products (SEG_ID, CLUS_ID)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_offers_seg_clus ON offers (SEG_ID, CLUS_ID)")
+    create_client_indexes(conn)
+
+
+def create_client_indexes(conn: sqlite3.Connection, table: str = "clients"):
+    """Index the segment columns of ``table`` that are not indexed yet.
+
+    Index names are global in SQLite and follow a table through a rename,
+    so a shadow table gets ``idx_clients_<column>_alt`` while the live table
+    holds ``idx_clients_<column>`` (and the other way round on the next swap).
+    """
+    cursor = conn.cursor()
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    indexed = set()
+    for index in cursor.execute(f"PRAGMA index_list({table})").fetchall():
+        columns = [row[2] for row in conn.execute(f'PRAGMA index_info("{index[1]}")')]
+        if len(columns) == 1:
+            indexed.add(columns[0])
+    index_names = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+    for column in SEGMENT_COLUMNS:
+        if column not in existing:
+            logging.warning(f"Segment column {column} missing from {table}, index skipped")
+            continue
+        if column in indexed:
+            continue
+        name = f"idx_clients_{column.lower()}"
+        if name in index_names:
+            name += "_alt"
+        cursor.execute(f'CREATE INDEX "{name}" ON {table} ({column})')
+
+
+def build_database(db_path: str, clients_csv: str, offers_csv: str,
+                   chunksize: Optional[int] = None, compact_floats: bool = False) -> Dict[str, float]:
+    """Build the SQLite database from the CSV exports and return per-step timings in seconds.
+
+    With ``chunksize`` the clients CSV is streamed in batches (see
+    ``load_clients_chunked``); otherwise it is read into memory in one go.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    def step(name, func, *args):
+        step_started = time.perf_counter()
+        result = func(*args)
+        timings[name] = round(time.perf_counter() - step_started, 3)
+        logging.info(f"{name}: {timings[name]:.3f}s")
+        return result
+
+    df_all_offers = step("read_offers_csv", pd.read_csv, offers_csv)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        # The database is rebuilt from the CSVs if anything goes wrong, so
+        # trade durability for bulk-load speed.
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA cache_size=-262144")
+
+        # Precomputed recommendations describe the old clients; rerun recommendations.py
+        conn.execute(f"DROP TABLE IF EXISTS {RECOMMENDATIONS_TABLE}")
+        conn.execute(f"DROP TABLE IF EXISTS {RECOMMENDATIONS_TABLE}_shadow")
+        if chunksize:
+            step("load_clients", load_clients_chunked, conn, clients_csv, chunksize, compact_floats)
+        else:
+            df_clients = step("read_clients_csv", pd.read_csv, clients_csv)
+            step("load_clients", load_clients, conn, df_clients)
+            del df_clients
+        step("load_catalogue", load_catalogue, conn, df_all_offers)
+        step("create_indexes", create_indexes, conn)
+        conn.commit()
+        step("analytics_snapshot", build_snapshot, conn)
+        step("analyze", conn.execute, "ANALYZE")
+        bump_data_version(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+    timings["total"] = round(time.perf_counter() - started, 3)
+    logging.info(f"Database {db_path} built in {timings['total']:.3f}s")
+    return timings
+
 
-df_clients = pd.read_csv("data/clustered_clients.csv")
-df_all_offers = pd.read_csv("data/cluster_offers.csv")
-
-df_products = df_all_offers[df_all_offers["ID"].str.startswith("P")].copy()
-df_offers = df_all_offers[df_all_offers["ID"].str.startswith("O")].copy()
-
-conn = sqlite3.connect("database.db")
-cursor = conn.cursor()
-
-df_clients.to_sql("clients", conn, if_exists="replace", index=False)
-
-cursor.execute("DROP TABLE IF EXISTS products")
-cursor.execute("""
-CREATE TABLE products (
-    ID TEXT,
-    SEG_ID INTEGER,
-    CLUS_ID INTEGER,
-    PROD TEXT,
-    ELIG TEXT,
-    DESCR TEXT
-)
-""")
-df_products.columns = ['ID', 'SEG_ID', 'CLUS_ID', 'PROD', 'ELIG', 'DESCR']
-df_products.to_sql("products", conn, if_exists="append", index=False)
-
-cursor.execute("DROP TABLE IF EXISTS offers")
-cursor.execute("""
-CREATE TABLE offers (
-    ID TEXT,
-    SEG_ID INTEGER,
-    CLUS_ID INTEGER,
-    PROD TEXT,
-    ELIG TEXT,
-    DESCR TEXT,
-    LINK TEXT
-)
-""")
-df_offers.columns = ['ID', 'SEG_ID', 'CLUS_ID', 'PROD', 'ELIG', 'DESCR', 'LINK']
-df_offers.to_sql("offers", conn, if_exists="append", index=False)
-
-conn.commit()
-conn.close()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the SQLite database from the clustered CSV exports.")
+    parser.add_argument("--db", default="database.db", help="output SQLite file")
+    parser.add_argument("--clients", default="data/clustered_clients.csv", help="clustered clients CSV")
+    parser.add_argument("--offers", default="data/cluster_offers.csv", help="cluster offers CSV")
+    parser.add_argument("--chunksize", type=int, default=100000,
+                        help="rows per clients batch; 0 reads the whole CSV into memory")
+    parser.add_argument("--compact-floats", action="store_true",
+                        help="read amount columns as float32 (rounds stored values)")
+    args = parser.parse_args()
 
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    build_database(args.db, args.clients, args.offers, args.chunksize, args.compact_floats)
@@ -0,0 +1,90 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class QueryCompileError(ValueError):
+    """Raised when a filter or projection references an unknown column or operator."""
+
+
+class ClientQueryCompiler:
+    """Compile query-string filters into a parameterised WHERE clause.
+
+    Filters are given as ``COLUMN=value`` for equality or ``COLUMN__op=value``
+    for the operators below. Column names are checked against the table
+    schema, so nothing from the request is ever interpolated into SQL unless
+    it is a known column.
+
+    - ``eq``/``ne``: ``GPI_COUNTY_NAME__ne=Cluj``
+    - ``gt``/``gte``/``lt``/``lte``: ``GPI_AGE__gte=18``
+    - ``between``: ``GPI_AGE__between=18,65`` (inclusive)
+    - ``in``: ``DEM_SEG__in=1,2,3`` (a list value is accepted as well)
+    """
+
+    OPERATOR_SEPARATOR = "__"
+
+    COMPARISONS = {
+        "eq": "=",
+        "ne": "!=",
+        "gt": ">",
+        "gte": ">=",
+        "lt": "<",
+        "lte": "<=",
+    }
+
+    def __init__(self, columns: Iterable[str]):
+        self.columns = list(columns)
+        self._known = set(self.columns)
+
+    def _check_column(self, column: str) -> str:
+        if column not in self._known:
+            raise QueryCompileError(f"Unknown column: {column}")
+        return column
+
+    @staticmethod
+    def _split_values(value) -> List:
+        if isinstance(value, (list, tuple)):
+            return list(value)
+        return [v.strip() for v in str(value).split(",") if v.strip() != ""]
+
+    def compile_where(self, filters: Dict) -> Tuple[str, List]:
+        """Return ``(where_clause, params)`` for the given filters."""
+        clause = "WHERE 1=1"
+        params = []
+
+        for key, value in filters.items():
+            column, _, op = key.partition(self.OPERATOR_SEPARATOR)
+            column = self._check_column(column)
+            op = op or ("in" if isinstance(value, (list, tuple)) else "eq")
+
+            if op in self.COMPARISONS:
+                clause += f" AND {column} {self.COMPARISONS[op]} ?"
+                params.append(value)
+            elif op == "in":
+                values = self._split_values(value)
+                if not values:
+                    raise QueryCompileError(f"{key} needs at least one value")
+                placeholders = ','.join('?' for _ in values)
+                clause += f" AND {column} IN ({placeholders})"
+                params.extend(values)
+            elif op == "between":
+                values = self._split_values(value)
+                if len(values) != 2:
+                    raise QueryCompileError(f"{key} needs exactly two values: low,high")
+                clause += f" AND {column} BETWEEN ? AND ?"
+                params.extend(values)
+            else:
+                raise QueryCompileError(f"Unknown operator '{op}' in {key}")
+
+        return clause, params
+
+    def compile_select(self, fields: Optional[Iterable[str]] = None,
+                       required: Iterable[str] = ()) -> str:
+        """Return the column list for SELECT; all columns when no fields are given."""
+        if not fields:
+            return "*"
+
+        selected = []
+        for column in list(required) + list(fields):
+            column = self._check_column(column)
+            if column not in selected:
+                selected.append(column)
+        return ", ".join(selected)
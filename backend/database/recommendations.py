@@ -0,0 +1,207 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from database.catalogue_index import SEGMENT_BY_ID, CatalogueIndex
+except ImportError:  # run as a script from backend/database
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from database.catalogue_index import SEGMENT_BY_ID, CatalogueIndex
+from recommender.eligibility import EligibilityRules
+
+RECOMMENDATIONS_TABLE = "client_recommendations"
+
+# Client columns every recommendation needs, besides the eligibility rule inputs
+BASE_COLUMNS = ["ID", "GPI_AGE", *SEGMENT_BY_ID.values()]
+
+
+def catalogue_version(products: CatalogueIndex, offers: CatalogueIndex,
+                      rules: Optional[EligibilityRules]) -> str:
+    """Stamp identifying the inputs recommendations were computed from."""
+    parts = [products.fingerprint, offers.fingerprint, rules.fingerprint if rules is not None else ""]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+def recommend(catalogue: CatalogueIndex, client: Dict, exclude: Optional[Iterable[str]] = None) -> List[dict]:
+    """Catalogue records for one client row (segments, GPI_AGE and rule inputs)."""
+    age = client.get("GPI_AGE")
+    minor = age is not None and age < 18
+    return catalogue.lookup(client, minor=minor, exclude=exclude)
+
+
+def read_recommendations(conn: sqlite3.Connection, client_id: str, table: str, version: str) -> Optional[List[dict]]:
+    """Precomputed products or offers of one client, or None if missing or built from another version."""
+    column = "PRODUCTS" if table == "products" else "OFFERS"
+    try:
+        row = conn.execute(
+            f"SELECT {column} FROM {RECOMMENDATIONS_TABLE} WHERE ID = ? AND VERSION = ?", (client_id, version)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None  # job has not been run on this database yet
+    return json.loads(row[0]) if row else None
+
+
+def invalidate_recommendations(conn: sqlite3.Connection, client_ids: Optional[List[str]] = None):
+    """Forget precomputed rows of changed clients (all rows if ``client_ids`` is None)."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (RECOMMENDATIONS_TABLE,)
+    ).fetchone()
+    if not exists:
+        return
+    if client_ids is None:
+        conn.execute(f"DELETE FROM {RECOMMENDATIONS_TABLE}")
+    else:
+        for start in range(0, len(client_ids), 500):
+            batch = client_ids[start:start + 500]
+            conn.execute(
+                f"DELETE FROM {RECOMMENDATIONS_TABLE} WHERE ID IN ({', '.join('?' * len(batch))})", batch
+            )
+    conn.commit()
+
+
+# -- batch job --------------------------------------------------------------
+
+# Per-process state of the job, set once by _init_worker
+_job = {}
+
+
+def _init_worker(db_path: str, products_csv: Optional[str]):
+    conn = sqlite3.connect(db_path)
+    try:
+        products = CatalogueIndex.load(conn, "products")
+        offers = CatalogueIndex.load(conn, "offers")
+        available = {row[1] for row in conn.execute("PRAGMA table_info(clients)")}
+    finally:
+        conn.close()
+    rules = EligibilityRules.from_csv(products_csv) if products_csv else None
+
+    columns = list(BASE_COLUMNS)
+    if rules is not None:
+        columns += [c for c in rules.columns if c in available and c not in columns]
+    _job.update(db_path=db_path, products=products, offers=offers, rules=rules, columns=columns,
+                version=catalogue_version(products, offers, rules))
+
+
+def _compute_range(bounds: Tuple[int, int]) -> List[Tuple[str, str, str]]:
+    """Recommendations for the clients with rowid in [low, high]: (ID, products JSON, offers JSON)."""
+    columns, rules = _job["columns"], _job["rules"]
+    conn = sqlite3.connect(_job["db_path"])
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(columns)} FROM clients WHERE rowid BETWEEN ? AND ?", bounds
+        ).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        return []
+
+    # Score the eligibility rules for the whole chunk at once
+    ineligible = [()] * len(rows)
+    if rules is not None:
+        data = {name: values for name, values in zip(columns, zip(*rows)) if name in rules.columns}
+        eligible, _ = rules.evaluate(data)
+        product_ids = np.array(rules.product_ids)
+        ineligible = [set(product_ids[~flags].tolist()) for flags in eligible]
+
+    results = []
+    for row, exclude in zip(rows, ineligible):
+        client = dict(zip(columns, row))
+        results.append((
+            client["ID"],
+            json.dumps(recommend(_job["products"], client, exclude)),
+            json.dumps(recommend(_job["offers"], client, exclude)),
+        ))
+    return results
+
+
+def build_recommendations(db_path: str, products_csv: Optional[str] = None,
+                          chunksize: int = 10000, workers: int = 1) -> Dict:
+    """Precompute products and offers for every client into client_recommendations.
+
+    Clients are processed in rowid ranges of ``chunksize``, across a pool of
+    ``workers`` processes when more than one. Rows are written to a shadow
+    table that replaces the live one in a single transaction, so the API
+    keeps serving the previous generation meanwhile. ``products_csv``
+    enables the bank_products.csv eligibility rules, as in the API.
+    """
+    started = time.perf_counter()
+    _init_worker(db_path, products_csv)
+    version = _job["version"]
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        # Workers (and the API) keep reading clients while the shadow table is written
+        conn.execute("PRAGMA journal_mode=WAL")
+        low, high = conn.execute("SELECT MIN(rowid), MAX(rowid) FROM clients").fetchone()
+        ranges = [(start, start + chunksize - 1) for start in range(low, high + 1, chunksize)] if low is not None else []
+
+        shadow = f"{RECOMMENDATIONS_TABLE}_shadow"
+        conn.execute(f"DROP TABLE IF EXISTS {shadow}")
+        conn.execute(f"""
+        CREATE TABLE {shadow} (
+            ID TEXT PRIMARY KEY,
+            PRODUCTS TEXT,
+            OFFERS TEXT,
+            VERSION TEXT,
+            BUILT_AT TEXT
+        )
+        """)
+        built_at = datetime.now(timezone.utc).isoformat()
+
+        def write(results):
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {shadow} (ID, PRODUCTS, OFFERS, VERSION, BUILT_AT) VALUES (?, ?, ?, ?, ?)",
+                [(client_id, products, offers, version, built_at) for client_id, products, offers in results]
+            )
+            return len(results)
+
+        written = 0
+        if workers > 1:
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(db_path, products_csv)) as pool:
+                for results in pool.map(_compute_range, ranges):
+                    written += write(results)
+                    logging.info(f"Precomputed recommendations for {written} clients")
+        else:
+            for bounds in ranges:
+                written += write(_compute_range(bounds))
+                logging.info(f"Precomputed recommendations for {written} clients")
+        conn.commit()
+
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute(f"DROP TABLE IF EXISTS {RECOMMENDATIONS_TABLE}")
+            cursor.execute(f"ALTER TABLE {shadow} RENAME TO {RECOMMENDATIONS_TABLE}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+
+    elapsed = round(time.perf_counter() - started, 3)
+    logging.info(f"Recommendations for {written} clients (version {version}) built in {elapsed:.3f}s")
+    return {"clients": written, "version": version, "seconds": elapsed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute product/offer recommendations for every client.")
+    parser.add_argument("--db", default="database.db", help="SQLite database built by db.py")
+    parser.add_argument("--products", default="../recommender/bank_products.csv",
+                        help="bank products CSV with the eligibility tags; empty disables them")
+    parser.add_argument("--chunksize", type=int, default=10000, help="clients per batch")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    build_recommendations(args.db, args.products or None, args.chunksize, args.workers)
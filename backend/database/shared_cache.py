@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+try:
+    import redis
+except ImportError:  # optional dependency, only needed for redis:// URLs
+    redis = None
+
+try:
+    import orjson
+except ImportError:  # optional dependency, falls back to the standard library encoder
+    orjson = None
+
+
+class FileCacheStore:
+    """Cross-process key/value store on the local filesystem.
+
+    Implements the subset of the Redis client interface used here (``get``,
+    ``set`` with ``ex``, ``delete``, ``flushdb``), so a Redis client can be
+    swapped in without code changes. Each key is one file written atomically
+    with ``os.replace``; reads are served from the OS page cache, which all
+    worker processes share. Only files named like the store's own entries
+    are ever removed, so pointing it at a shared directory loses nothing else.
+    """
+
+    # Every file starts with the expiry time as a double (0 = no expiry)
+    _HEADER = struct.Struct("<d")
+    _SUFFIX = ".cache"
+    _TMP_PREFIX = ".tmp-cache-"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + self._SUFFIX)
+
+    def _is_own_file(self, name: str) -> bool:
+        if name.startswith(self._TMP_PREFIX):
+            return True
+        digest = name[:-len(self._SUFFIX)]
+        return (name.endswith(self._SUFFIX) and len(digest) == 40
+                and all(c in "0123456789abcdef" for c in digest))
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        if len(data) < self._HEADER.size:
+            return None
+        expires_at, = self._HEADER.unpack_from(data)
+        if expires_at and expires_at <= time.time():
+            self.delete(key)
+            return None
+        return data[self._HEADER.size:]
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None) -> bool:
+        expires_at = time.time() + ex if ex else 0.0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=self._TMP_PREFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._HEADER.pack(expires_at))
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return True
+
+    def delete(self, *keys: str) -> int:
+        deleted = 0
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def flushdb(self) -> bool:
+        for name in os.listdir(self.directory):
+            if not self._is_own_file(name):
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+        return True
+
+
+def create_store(url: str):
+    """Create a store from ``file:///path/to/dir`` or ``redis://host:port/db``."""
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        return FileCacheStore(parsed.netloc + parsed.path)
+    if parsed.scheme in ("redis", "rediss", "unix"):
+        if redis is None:
+            raise RuntimeError("The redis package is required for a redis:// shared cache")
+        return redis.Redis.from_url(url)
+    raise ValueError(f"Unsupported shared cache URL: {url}")
+
+
+class SharedProfileCache:
+    """Client profile cache shared by every worker process.
+
+    Rows are stored as JSON (orjson when installed) under
+    ``<prefix><client_id>`` in any store with the Redis ``get``/``set``/
+    ``delete`` interface, together with the data version they were read at.
+    A row from another version is a miss, so a worker that read a row just
+    before a refresh cannot put it back for everyone. Store failures are
+    logged and treated as misses, so an unavailable cache never fails a
+    request.
+    """
+
+    def __init__(self, store, ttl: Optional[int] = 3600, prefix: str = "client:"):
+        self.store = store
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "errors": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, client_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """The cached row of ``client_id`` if it was read at data version ``version``."""
+        try:
+            payload = self.store.get(self.prefix + client_id)
+        except Exception as e:
+            logging.warning(f"Shared cache read failed: {str(e)}")
+            self._count("errors")
+            return None
+
+        if payload is None:
+            self._count("misses")
+            return None
+        try:
+            entry = orjson.loads(payload) if orjson is not None else json.loads(payload)
+            entry_version, row = entry["version"], entry["row"]
+        except (ValueError, TypeError, KeyError):
+            logging.warning(f"Shared cache entry for {client_id} is not a valid entry, ignored")
+            self._count("errors")
+            return None
+        if entry_version != version:
+            self._count("stale")
+            return None
+        self._count("hits")
+        return row
+
+    def set(self, client_id: str, value: Dict[str, Any], version: int):
+        """Cache ``value``, read at data version ``version``."""
+        entry = {"version": version, "row": value}
+        # Data only: the store may be writable by others, so it must never hold code (no pickle)
+        if orjson is not None:
+            payload = orjson.dumps(entry, option=orjson.OPT_SERIALIZE_NUMPY)
+        else:
+            payload = json.dumps(entry, separators=(",", ":")).encode("utf-8")
+        try:
+            self.store.set(self.prefix + client_id, payload, ex=self.ttl)
+        except Exception as e:
+            logging.warning(f"Shared cache write failed: {str(e)}")
+            self._count("errors")
+
+    def delete(self, client_ids: Iterable[str]):
+        keys = [self.prefix + client_id for client_id in client_ids]
+        if not keys:
+            return
+        try:
+            self.store.delete(*keys)
+        except Exception as e:
+            logging.warning(f"Shared cache delete failed: {str(e)}")
+            self._count("errors")
+
+    def clear(self):
+        # Dedicated stores only: flushdb drops every key in the store
+        try:
+            self.store.flushdb()
+        except Exception as e:
+            logging.warning(f"Shared cache flush failed: {str(e)}")
+            self._count("errors")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["backend"] = type(self.store).__name__
+        return stats
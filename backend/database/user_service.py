@@ -1,12 +1,38 @@
 import pandas as pd
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import logging
 
+from database.bounded_cache import BoundedCache
+from instrumentation import timed
+
+# Verbose dumps of client rows, enabled with LOG_PAYLOADS (see log_pipeline.py)
+payload_logger = logging.getLogger("payloads")
+
+# Client features listed first in the payload log
+KEY_FEATURES = [
+    'ID', 'GPI_AGE', 'GPI_CLS_CODE_PT_OCCUP', 'GPI_CLS_PT_EDU_DESC',
+    'GPI_COUNTY_NAME', 'GPI_CUSTOMER_TYPE_DESC', 'CLIENT_TENURE',
+    'CEC_TOTAL_BALANCE_AMT', 'DEP_TOTAL_BALANCE_AMT', 'CRT_TOTAL_BALANCE_AMT'
+]
+
 class UserService:
-    def __init__(self, client_data_service):
+    def __init__(self, client_data_service, cache_max_entries: int = 10000,
+                 cache_max_bytes: Optional[int] = 256 * 1024 * 1024,
+                 cache_ttl: Optional[float] = 3600, shared_cache=None):
         self.client_data_service = client_data_service
-        self.user_cache = {}  # In-memory cache for user data
+        # Optional cache shared across worker processes (SharedProfileCache)
+        self.shared_cache = shared_cache
+        # In-memory LRU cache for user data, bounded by size, bytes and age.
+        # Entries are (data version, row): a refresh handled by another worker
+        # bumps the version, which turns this worker's old rows into misses.
+        self.user_cache = BoundedCache(
+            max_entries=cache_max_entries,
+            max_bytes=cache_max_bytes,
+            ttl=cache_ttl
+        )
+        self.client_data_service.add_refresh_listener(self._on_clients_refreshed)
         
+    @timed("UserService.authenticate_user")
     def authenticate_user(self, user_id: str) -> bool:
         """Verify if a user ID exists in the database."""
         try:
@@ -16,44 +42,42 @@ class UserService:
             logging.error(f"Authentication error: {str(e)}")
             return False
             
+    @timed("UserService.get_user_data")
     def get_user_data(self, user_id: str) -> Optional[Dict]:
         """Retrieve user data and cache it."""
+        version = self.client_data_service.data_version()
+
         # Check cache first
-        if user_id in self.user_cache:
-            print(f"\n[CACHE HIT] User data retrieved from cache for ID: {user_id}")
-            return self.user_cache[user_id]
+        cached = self.user_cache.get(user_id)
+        if cached is not None:
+            if cached[0] == version:
+                payload_logger.debug("User data for %s served from cache", user_id)
+                return cached[1]
+            self.user_cache.pop(user_id)
+
+        # Then the cache shared with the other workers, only if read at this version
+        if self.shared_cache is not None:
+            shared = self.shared_cache.get(user_id, version)
+            if shared is not None:
+                self.user_cache.set(user_id, (version, shared))
+                return shared
             
         # Get data from database
         try:
             user_data = self.client_data_service.get_client_data(user_id)
             if user_data is not None:
-                # Print statements for debugging
-                print(f"\n{'='*60}")
-                print(f"CACHING USER DATA - ID: {user_id}")
-                print(f"{'='*60}")
-                
-                # Print key client features
-                important_features = [
-                    'ID', 'GPI_AGE', 'GPI_CLS_CODE_PT_OCCUP', 'GPI_CLS_PT_EDU_DESC',
-                    'GPI_COUNTY_NAME', 'GPI_CUSTOMER_TYPE_DESC', 'CLIENT_TENURE',
-                    'CEC_TOTAL_BALANCE_AMT', 'DEP_TOTAL_BALANCE_AMT', 'CRT_TOTAL_BALANCE_AMT'
-                ]
-                
-                print("KEY FEATURES:")
-                for feature in important_features:
-                    if feature in user_data:
-                        print(f"  {feature}: {user_data[feature]}")
-                
-                print(f"\nALL FEATURES ({len(user_data)} total):")
-                for key, value in user_data.items():
-                    print(f"  {key}: {value}")
-                
-                print(f"{'='*60}")
-                print(f"Data successfully cached for user: {user_id}")
-                print(f"{'='*60}\n")
-                
-                # Cache the data
-                self.user_cache[user_id] = user_data
+                # Key features first, then the full row; only built if enabled
+                if payload_logger.isEnabledFor(logging.DEBUG):
+                    payload_logger.debug(
+                        "Caching user data for %s: %s; all %d features: %s", user_id,
+                        {feature: user_data[feature] for feature in KEY_FEATURES if feature in user_data},
+                        len(user_data), user_data
+                    )
+
+                # Cache the data, tagged with the version read before the row
+                self.user_cache.set(user_id, (version, user_data))
+                if self.shared_cache is not None:
+                    self.shared_cache.set(user_id, user_data, version)
                 return user_data
             return None
         except Exception as e:
@@ -63,17 +87,37 @@ class UserService:
     def clear_cache(self, user_id: str = None):
         """Clear cache for specific user or all users."""
         if user_id:
-            if user_id in self.user_cache:
-                del self.user_cache[user_id]
-                print(f"Cache cleared for user: {user_id}")
+            if self.shared_cache is not None:
+                self.shared_cache.delete([user_id])
+            if self.user_cache.pop(user_id) is not None:
+                logging.info(f"Cache cleared for user: {user_id}")
         else:
+            if self.shared_cache is not None:
+                self.shared_cache.clear()
             self.user_cache.clear()
-            print("All user cache cleared")
+            logging.info("All user cache cleared")
             
+    def _on_clients_refreshed(self, client_ids: Optional[List[str]]):
+        """Drop cached rows that a data refresh made stale."""
+        if client_ids is None:
+            self.clear_cache()
+            return
+        for client_id in client_ids:
+            self.user_cache.pop(client_id, None)
+        if self.shared_cache is not None:
+            self.shared_cache.delete(client_ids)
+
     def get_cached_user_count(self) -> int:
         """Get the number of users currently cached."""
         return len(self.user_cache)
         
     def get_cached_user_ids(self) -> list:
         """Get list of user IDs currently in cache."""
-        return list(self.user_cache.keys())
\ No newline at end of file
+        return self.user_cache.keys()
+
+    def get_cache_stats(self) -> Dict:
+        """Get hit/miss/eviction counters of the local and shared user caches."""
+        stats = {"local": self.user_cache.get_stats()}
+        if self.shared_cache is not None:
+            stats["shared"] = self.shared_cache.get_stats()
+        return stats
\ No newline at end of file
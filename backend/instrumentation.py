@@ -0,0 +1,312 @@
+"""Timing spans, Prometheus metrics and a sampling profiler for the backend.
+
+Code paths are timed with ``span()`` / ``@timed()``: every span is observed
+into the ``app_span_seconds`` histogram and, while a request is being
+served, also summed per request so routes/metrics.py can report a
+Server-Timing breakdown. The registry renders the Prometheus text format
+for /metrics. Everything here is dependency-free and thread-safe.
+"""
+import bisect
+import contextvars
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination."""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)  # first bucket with value <= bound
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, counts, total in series:
+            cumulative = list(itertools.accumulate(counts))
+            for bound, count in zip([*map(str, self.buckets), "+Inf"], cumulative):
+                le = 'le="' + bound + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics plus callbacks sampled at scrape time, rendered as Prometheus text."""
+
+    def __init__(self):
+        self._metrics = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def callback(self, name: str, help_text: str, labels: Sequence[str],
+                 func: Callable[[], Dict[Tuple, float]], kind: str = "gauge"):
+        """Metric read from ``func`` at scrape time: {label values: value}, e.g. cache stats."""
+        self._register(_CallbackMetric(name, help_text, labels, func, kind))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+class _CallbackMetric:
+    def __init__(self, name, help_text, labels, func, kind):
+        self.name, self.help_text, self.labels, self.func, self.kind = name, help_text, tuple(labels), func, kind
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            values = self.func()
+        except Exception:
+            return lines  # a failing source must not break the whole scrape
+        lines += [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values.items()]
+        return lines
+
+
+# Process-wide registry served by /metrics
+registry = MetricsRegistry()
+
+SPAN_SECONDS = registry.histogram("app_span_seconds", "Time spent in instrumented code paths.", ["span"])
+SQL_SECONDS = registry.histogram("sqlite_statement_seconds", "SQLite statement execution time.", ["statement"])
+CACHE_REQUESTS = registry.counter("app_cache_requests_total", "Cache lookups by cache and result.",
+                                  ["cache", "result"])
+
+# name -> [total seconds, calls] for the request being served in this context
+_request_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+def start_request_spans():
+    """Begin collecting spans for the current request; returns a token for ``end_request_spans``."""
+    return _request_spans.set({})
+
+
+def end_request_spans(token) -> Dict[str, List[float]]:
+    spans = _request_spans.get() or {}
+    _request_spans.reset(token)
+    return spans
+
+
+def record_span(name: str, seconds: float):
+    SPAN_SECONDS.observe(seconds, span=name)
+    spans = _request_spans.get()
+    if spans is not None:
+        entry = spans.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def span(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)
+
+
+def timed(name: Optional[str] = None):
+    """Decorator timing every call of a function as span ``name`` (default: its qualified name)."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_span(span_name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def count_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+_STATEMENT = re.compile(r"^\s*(\w+)(?:.*?\b(?:FROM|INTO|UPDATE|TABLE)\s+(\w+))?", re.IGNORECASE | re.DOTALL)
+_statement_labels = {}
+
+
+def statement_label(sql: str) -> str:
+    """Low-cardinality label of a statement: its verb and first table, e.g. "SELECT clients"."""
+    label = _statement_labels.get(sql)
+    if label is None:
+        match = _STATEMENT.match(sql)
+        label = " ".join(filter(None, (match.group(1).upper(), match.group(2)))) if match else "OTHER"
+        if len(_statement_labels) < 1024:
+            _statement_labels[sql] = label
+    return label
+
+
+def record_statement(sql: str, seconds: float):
+    """Statement timer for the connection pool's TimedConnection."""
+    SQL_SECONDS.observe(seconds, statement=statement_label(sql))
+    spans = _request_spans.get()
+    if spans is not None:
+        entry = spans.setdefault("sql", [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+# -- sampling profiler -------------------------------------------------------
+
+class ProfileSession(threading.Thread):
+    """Samples one thread's stack every ``interval`` seconds until stopped."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = {}
+        self._stop_event = threading.Event()
+        self.started_at = time.perf_counter()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.samples[key] = self.samples.get(key, 0) + 1
+
+    def stop(self) -> Dict[str, int]:
+        self._stop_event.set()
+        self.join()
+        return self.samples
+
+
+class SamplingProfiler:
+    """Opt-in stack sampler for single requests.
+
+    Off until ``enabled`` is set (at runtime, by an admin); then a request
+    that asks for it is sampled from a side thread, which costs the request
+    nothing but the GIL contention of the sampler. Profiles are kept in
+    collapsed-stack format ("frame;frame;frame count" per line, readable by
+    flamegraph.pl and speedscope), the last ``keep`` of them.
+    """
+
+    def __init__(self, interval: float = 0.002, keep: int = 20, enabled: bool = False):
+        self.interval = interval
+        self.keep = keep
+        self.enabled = enabled
+        self._profiles = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self, thread_id: Optional[int] = None) -> ProfileSession:
+        session = ProfileSession(thread_id or threading.get_ident(), self.interval)
+        session.start()
+        return session
+
+    def finish(self, session: ProfileSession, label: str) -> str:
+        samples = session.stop()
+        profile_id = str(next(self._ids))
+        profile = {
+            "id": profile_id,
+            "label": label,
+            "seconds": round(time.perf_counter() - session.started_at, 6),
+            "samples": sum(samples.values()),
+            "collapsed": "\n".join(f"{stack} {count}" for stack, count in
+                                   sorted(samples.items(), key=lambda item: -item[1])),
+        }
+        with self._lock:
+            self._profiles[profile_id] = profile
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return [{k: v for k, v in profile.items() if k != "collapsed"} for profile in self._profiles.values()]
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,120 @@
+"""Non-blocking, structured logging for the backend.
+
+Request threads only put records on an in-memory queue; a background
+QueueListener thread formats them and does the file and console I/O.
+Messages logged with %-style arguments are formatted on that thread too,
+and only if the record survives level checks and sampling. app.log gets
+one JSON object per line, the console keeps the plain text format.
+
+Full client rows and recommendation payloads go to the "payloads" logger,
+which is silent unless LOG_PAYLOADS is enabled.
+"""
+import atexit
+import datetime
+import json
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
+
+# Logger for verbose payload dumps (client features, products, offers)
+payload_logger = logging.getLogger("payloads")
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+# Attributes every LogRecord has; anything else was passed through ``extra=``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, ``extra`` fields and traceback."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(
+                timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of the records of some levels, e.g. {logging.INFO: 0.1}.
+
+    Levels without a rate are always kept, so warnings and errors are never
+    dropped unless configured explicitly.
+    """
+
+    def __init__(self, rates: Dict[int, float]):
+        super().__init__()
+        self.rates = rates
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno)
+        if rate is None or rate >= 1 or random.random() < rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class LazyQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler merges ``msg % args`` in the calling thread so records
+    can cross process boundaries; this queue is in-process, so the record is
+    enqueued as is. Arguments are therefore formatted after the call
+    returns: don't log objects that are mutated straight afterwards.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_sample_rates(spec: Optional[str]) -> Dict[int, float]:
+    """"DEBUG:0.01,INFO:0.5" -> {10: 0.01, 20: 0.5}."""
+    rates = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        level, _, rate = part.partition(":")
+        levelno = logging.getLevelName(level.strip().upper())
+        if not isinstance(levelno, int):
+            raise ValueError(f"Unknown log level in sample rates: {level}")
+        rates[levelno] = float(rate)
+    return rates
+
+
+def setup_logging(file_handler: logging.Handler, level: int = logging.INFO, json_file: bool = True,
+                  sample_rates: Optional[Dict[int, float]] = None, payloads: bool = False) -> QueueListener:
+    """Route the root logger through a queue to ``file_handler`` and the console.
+
+    Returns the started listener; it is stopped (flushing the queue) at exit.
+    """
+    file_handler.setFormatter(JsonFormatter() if json_file else logging.Formatter(TEXT_FORMAT))
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+    logging.basicConfig(level=level, handlers=[queue_handler])
+
+    # Payload dumps are DEBUG records of their own logger, off by default
+    payload_logger.setLevel(logging.DEBUG if payloads else logging.WARNING)
+
+    handlers: List[logging.Handler] = [file_handler, console]
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
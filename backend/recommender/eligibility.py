@@ -0,0 +1,181 @@
+import csv
+import hashlib
+import json
+import re
+from typing import Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Client attribute -> column of the clients table it is read from
+ATTRIBUTE_COLUMNS = {
+    "age": "GPI_AGE",
+    "tenure": "CLIENT_TENURE",
+    # There is no declared income column; monthly inflows are the closest proxy
+    "income": "TRX_IN_ALL_AMT",
+    "rejected_loans": "PTS_REJECTED_LOANS_REQ_CNT",
+}
+
+# Eligibility hashtag -> (attribute, lower bound, upper bound), bounds inclusive
+TAG_PATTERNS = [
+    (re.compile(r"^(\d+)plus$"), lambda m: ("age", float(m.group(1)), np.inf)),
+    (re.compile(r"^max(\d+)$"), lambda m: ("age", -np.inf, float(m.group(1)))),
+    (re.compile(r"^sub(\d+)ani$"), lambda m: ("age", -np.inf, np.nextafter(float(m.group(1)), -np.inf))),
+    (re.compile(r"^(\d+)_(\d+)ani$"), lambda m: ("age", float(m.group(1)), float(m.group(2)))),
+    (re.compile(r"^vechime(\d+)\+?$"), lambda m: ("tenure", float(m.group(1)), np.inf)),
+    (re.compile(r"^(?:venit|salariu|incasare)(\d+)\+?$"), lambda m: ("income", float(m.group(1)), np.inf)),
+    (re.compile(r"^istoricOk$"), lambda m: ("rejected_loans", -np.inf, 0.0)),
+]
+
+_TAG = re.compile(r"#(\S+)")
+
+
+def parse_tags(text: Optional[str]) -> List[str]:
+    """Split an Eligibilitate cell ("#18plus #max65") into its tags, without the '#'."""
+    return _TAG.findall(text or "")
+
+
+def compile_tag(tag: str) -> Optional[Tuple[str, float, float]]:
+    """Translate one tag into an (attribute, low, high) bound, or None if it cannot be checked."""
+    for pattern, build in TAG_PATTERNS:
+        match = pattern.match(tag)
+        if match:
+            return build(match)
+    return None
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _as_column(values, rows: int) -> np.ndarray:
+    if values is None:
+        return np.full(rows, np.nan)
+    array = np.asarray(values)
+    if array.dtype.kind in "biuf":
+        return array.astype(np.float64, copy=False)
+    # Object/text data (e.g. values straight from sqlite rows)
+    return np.array([_as_float(v) for v in array.ravel()], dtype=np.float64)
+
+
+class EligibilityRules:
+    """The eligibility tags of the product catalogue, compiled once into numeric bounds.
+
+    Every checkable tag becomes one rule ``low <= column <= high`` owned by
+    one product. Evaluation compares all clients against all rules in one
+    broadcast NumPy operation and folds the failures into products with a
+    segmented reduction, so scoring a single client or the whole client
+    base involves no string parsing.
+
+    Tags with no rule (``#george``, ``#parinte``, ...) are reported as
+    unverified and never block a product. A missing client value makes the
+    rule unknown rather than failed.
+    """
+
+    def __init__(self, product_tags: Mapping[str, Sequence[str]],
+                 attribute_columns: Optional[Dict[str, str]] = None):
+        attribute_columns = attribute_columns or ATTRIBUTE_COLUMNS
+        self.product_ids = list(product_tags)
+        self.unverified = {}
+        # Digest of the tags and column mapping, changes whenever the rules do
+        self.fingerprint = hashlib.sha1(json.dumps(
+            [{k: list(v) for k, v in product_tags.items()}, attribute_columns], sort_keys=True
+        ).encode()).hexdigest()
+
+        products, columns, lows, highs, tags = [], [], [], [], []
+        for position, product_id in enumerate(self.product_ids):
+            skipped = []
+            for tag in product_tags[product_id]:
+                rule = compile_tag(tag)
+                if rule is None or rule[0] not in attribute_columns:
+                    skipped.append(tag)
+                    continue
+                attribute, low, high = rule
+                products.append(position)
+                columns.append(attribute_columns[attribute])
+                lows.append(low)
+                highs.append(high)
+                tags.append(tag)
+            self.unverified[product_id] = skipped
+
+        # Distinct client columns the rules read, and each rule's index into them
+        self.columns = sorted(set(columns))
+        self._rule_column = np.array([self.columns.index(c) for c in columns], dtype=np.intp)
+        self._low = np.array(lows, dtype=np.float64)
+        self._high = np.array(highs, dtype=np.float64)
+        self._rule_tags = tags
+        self._rule_product = np.array(products, dtype=np.intp)
+
+        # Rules are grouped by product, so failures fold into products with one reduceat
+        self._ruled_products, self._rule_starts = np.unique(self._rule_product, return_index=True)
+
+    @classmethod
+    def from_csv(cls, csv_path: str, attribute_columns: Optional[Dict[str, str]] = None) -> "EligibilityRules":
+        """Compile the Eligibilitate column of bank_products.csv."""
+        with open(csv_path, newline="", encoding="utf-8-sig") as f:
+            product_tags = {row["ID"]: parse_tags(row.get("Eligibilitate")) for row in csv.DictReader(f)}
+        return cls(product_tags, attribute_columns)
+
+    def __len__(self) -> int:
+        return len(self._rule_tags)
+
+    def _outcomes(self, data: Mapping[str, Sequence]) -> Tuple[np.ndarray, np.ndarray]:
+        """Per client and rule: (failed, unknown), both shaped (clients, rules)."""
+        present = [data.get(column) for column in self.columns]
+        rows = max((len(values) for values in present if values is not None), default=0)
+        if self.columns:
+            matrix = np.column_stack([_as_column(values, rows) for values in present])
+        else:
+            matrix = np.empty((rows, 0))
+
+        values = matrix[:, self._rule_column]
+        unknown = np.isnan(values)
+        with np.errstate(invalid="ignore"):
+            failed = ~unknown & ((values < self._low) | (values > self._high))
+        return failed, unknown
+
+    def evaluate(self, data: Mapping[str, Sequence]) -> Tuple[np.ndarray, np.ndarray]:
+        """Score many clients at once.
+
+        ``data`` maps column names to equally long arrays (one entry per
+        client); columns the rules need but ``data`` lacks count as unknown.
+        Returns two (clients, products) boolean matrices, ordered as
+        ``product_ids``: ``eligible`` (no rule failed) and ``unknown`` (at
+        least one rule could not be checked).
+        """
+        failed, unknown = self._outcomes(data)
+        rows = failed.shape[0]
+        eligible = np.ones((rows, len(self.product_ids)), dtype=bool)
+        not_checked = np.zeros((rows, len(self.product_ids)), dtype=bool)
+        if len(self._rule_starts):
+            eligible[:, self._ruled_products] = ~np.logical_or.reduceat(failed, self._rule_starts, axis=1)
+            not_checked[:, self._ruled_products] = np.logical_or.reduceat(unknown, self._rule_starts, axis=1)
+        return eligible, not_checked
+
+    def check_client(self, client: Mapping) -> Dict[str, Dict]:
+        """Explain the eligibility of one client row for every product.
+
+        Returns ``{product_id: {"eligible", "failed", "unverified"}}`` where
+        ``failed`` lists the tags the client does not meet and
+        ``unverified`` the tags that could not be checked.
+        """
+        failed, unknown = self._outcomes({column: [client.get(column)] for column in self.columns})
+        result = {
+            product_id: {"eligible": True, "failed": [], "unverified": list(self.unverified[product_id])}
+            for product_id in self.product_ids
+        }
+        for rule in np.flatnonzero(failed[0] | unknown[0]):
+            entry = result[self.product_ids[self._rule_product[rule]]]
+            if failed[0, rule]:
+                entry["eligible"] = False
+                entry["failed"].append(self._rule_tags[rule])
+            else:
+                entry["unverified"].append(self._rule_tags[rule])
+        return result
+
+    def ineligible_ids(self, client: Mapping) -> Set[str]:
+        """IDs of the products one client row fails at least one rule for."""
+        failed, _ = self._outcomes({column: [client.get(column)] for column in self.columns})
+        return {self.product_ids[i] for i in np.unique(self._rule_product[failed[0]])}
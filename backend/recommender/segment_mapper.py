@@ -0,0 +1,132 @@
+import csv
+import json
+import logging
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+_CLUSTER = re.compile(r"(\d+)$")
+
+
+def _cluster_number(value) -> Optional[int]:
+    """Cluster of a mapper entry ("Cluster 3") or client column (3, 3.0, "3") as an int."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        match = _CLUSTER.search(value.strip())
+        return int(match.group(1)) if match else None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else None
+
+
+class SegmentMapper:
+    """Indexed view of recommender/mapper.json joined with bank_products.csv.
+
+    mapper.json lists, per segment and cluster, a display name and the IDs of
+    the products and offers aimed at it. Loading resolves every ID against
+    the catalogue once and builds both directions of the association:
+    (segment, cluster) -> product IDs and product ID -> clusters. Ranking a
+    client is then six dictionary lookups and a merge.
+    """
+
+    def __init__(self, segments: List[str], clusters: Dict[Tuple[str, int], Dict],
+                 catalogue: Dict[str, Dict]):
+        self.segments = segments
+        # (segment, cluster) -> {"name": display name, "products": [IDs]}
+        self._clusters = clusters
+        self.catalogue = catalogue
+
+        self._product_clusters = {}
+        for key, cluster in clusters.items():
+            for product_id in cluster["products"]:
+                self._product_clusters.setdefault(product_id, []).append(key)
+
+    @classmethod
+    def load(cls, mapper_path: str, products_csv: str) -> "SegmentMapper":
+        with open(products_csv, newline="", encoding="utf-8-sig") as f:
+            catalogue = {
+                row["ID"]: {
+                    "id": row["ID"],
+                    "name": row["Produs"],
+                    "bank": row.get("Banca"),
+                    "category": row.get("Categorie"),
+                    "target": row.get("Target"),
+                    "link": row.get("Link") or None,
+                }
+                for row in csv.DictReader(f)
+            }
+        with open(mapper_path, "r") as f:
+            mapper = json.load(f)
+
+        segments, clusters, unknown = [], {}, set()
+        for segment in mapper["segmentsList"]:
+            segments.append(segment["segment"])
+            for cluster in segment["clustersList"]:
+                products = []
+                for product_id in cluster["products"]:
+                    if product_id not in catalogue:
+                        unknown.add(product_id)
+                    elif product_id not in products:
+                        products.append(product_id)
+                key = (segment["segment"], _cluster_number(cluster["cluster"]))
+                clusters[key] = {"name": cluster.get("name"), "products": products}
+
+        if unknown:
+            logging.warning(f"mapper.json references unknown products: {', '.join(sorted(unknown))}")
+        return cls(segments, clusters, catalogue)
+
+    def cluster_name(self, segment: str, cluster) -> Optional[str]:
+        entry = self._clusters.get((segment, _cluster_number(cluster)))
+        return entry["name"] if entry else None
+
+    def products_for(self, segment: str, cluster) -> List[str]:
+        entry = self._clusters.get((segment, _cluster_number(cluster)))
+        return list(entry["products"]) if entry else []
+
+    def clusters_for(self, product_id: str) -> List[Dict]:
+        """Every (segment, cluster) a product is recommended to, with the cluster names."""
+        return [
+            {"segment": segment, "cluster": cluster, "name": self._clusters[(segment, cluster)]["name"]}
+            for segment, cluster in self._product_clusters.get(product_id, [])
+        ]
+
+    def describe_client(self, client: Mapping) -> Dict[str, Dict]:
+        """The client's cluster and its display name in each segment."""
+        return {
+            segment: {"cluster": _cluster_number(client.get(segment)),
+                      "name": self.cluster_name(segment, client.get(segment))}
+            for segment in self.segments
+        }
+
+    def rank(self, client: Mapping, exclude: Optional[Iterable[str]] = None,
+             limit: Optional[int] = None) -> List[Dict]:
+        """Products and offers for a client row, ranked across its six segments.
+
+        A product scores one point per segment whose cluster recommends it;
+        ties keep mapper order (segment order, then list order). Each product
+        appears once, with the clusters that matched; IDs in ``exclude``
+        (e.g. failed eligibility) are left out.
+        """
+        exclude = set(exclude or ())
+        matches = {}
+        for segment in self.segments:
+            cluster = _cluster_number(client.get(segment))
+            entry = self._clusters.get((segment, cluster))
+            if entry is None:
+                continue
+            for product_id in entry["products"]:
+                if product_id in exclude:
+                    continue
+                matches.setdefault(product_id, []).append(
+                    {"segment": segment, "cluster": cluster, "name": entry["name"]}
+                )
+
+        ranked = sorted(matches.items(), key=lambda item: -len(item[1]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [
+            {**self.catalogue[product_id], "score": len(matched), "segments": matched}
+            for product_id, matched in ranked
+        ]
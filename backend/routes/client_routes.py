@@ -1,14 +1,25 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import logging
+import os
 from typing import Dict, Any
 
+from database.columnar_engine import AggregateError
+from database.query_compiler import QueryCompileError
+from routes.http_cache import response_cache
+
 # Create a blueprint for client data endpoints
 client_bp = Blueprint('client', __name__, url_prefix='/api/clients')
 
 # This will be initialized in app.py
 client_service = None
 
+# Directory that refresh files are read from
+REFRESH_DATA_DIR = os.path.join("database", "data")
+
+# Largest page served at once; bulk reads go through format=ndjson
+MAX_PAGE_SIZE = 1000
+
 def init_client_routes(app, data_service):
     """Initialize the client routes with the data service."""
     global client_service
@@ -19,7 +30,17 @@ def init_client_routes(app, data_service):
 @client_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_clients():
-    """Get clients based on query parameters."""
+    """Get clients based on query parameters.
+
+    Filters are ``COLUMN=value`` or ``COLUMN__op=value`` with op one of
+    eq, ne, gt, gte, lt, lte, between, in; ``fields=ID,GPI_AGE,...`` limits
+    the returned columns. Pagination is done by the database: ``page``/
+    ``page_size`` (at most MAX_PAGE_SIZE, larger values are clamped) for
+    offset pagination or ``after=<last ID>`` for keyset pagination.
+    ``format=ndjson`` streams every matching client as newline-delimited
+    JSON instead, for bulk reads; ``format=columns`` returns the page as
+    ``columns`` plus ``rows`` arrays, without repeating the keys per client.
+    """
     try:
         current_user = get_jwt_identity()
         logging.info(f"User {current_user} accessed client list.")
@@ -30,22 +51,44 @@ def get_clients():
         # Apply pagination if provided
         page = int(query_params.pop('page', 1))
         page_size = int(query_params.pop('page_size', 50))
-        
-        # Use the client service to search
-        clients = client_service.search_clients(query_params)
-        
-        # Apply pagination
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        paginated_clients = clients[start_idx:end_idx]
-        
-        return jsonify({
-            'data': paginated_clients,
-            'total': len(clients),
+        after_id = query_params.pop('after', None)
+        output_format = query_params.pop('format', 'json')
+        fields = query_params.pop('fields', None)
+        fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+
+        if page < 1 or page_size < 1:
+            return jsonify({"error": "page and page_size must be positive"}), 400
+        # The response reports the page_size actually used
+        page_size = min(page_size, MAX_PAGE_SIZE)
+
+        if output_format == 'ndjson':
+            rows = client_service.iter_clients(query_params, fields=fields)
+            encoder = current_app.json
+            body = (encoder.dumps_bytes(row) + b"\n" for row in rows)
+            return Response(stream_with_context(body), mimetype='application/x-ndjson')
+
+        # Use the client service to fetch a single page
+        columns, rows = client_service.search_client_rows(
+            query_params,
+            limit=page_size,
+            offset=(page - 1) * page_size,
+            after_id=after_id,
+            fields=fields
+        )
+        total = client_service.count_clients(query_params)
+
+        page_info = {
+            'total': total,
             'page': page,
             'page_size': page_size,
-            'total_pages': (len(clients) - 1) // page_size + 1
-        })
+            'total_pages': (total - 1) // page_size + 1,
+            'next_after': rows[-1][columns.index('ID')] if len(rows) == page_size else None
+        }
+        if output_format == 'columns':
+            return jsonify({'columns': columns, 'rows': rows, **page_info})
+        return jsonify({'data': [dict(zip(columns, row)) for row in rows], **page_info})
+    except QueryCompileError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logging.error(f"Error getting clients: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -70,6 +113,7 @@ def get_client(client_id):
 
 @client_bp.route('/segments', methods=['GET'])
 @jwt_required()
+@response_cache.cached(per_user=False)
 def get_segments():
     """Get client segments."""
     try:
@@ -84,6 +128,7 @@ def get_segments():
 
 @client_bp.route('/balances', methods=['GET'])
 @jwt_required()
+@response_cache.cached(per_user=False)
 def get_balances():
     """Get average balances by account type."""
     try:
@@ -98,6 +143,7 @@ def get_balances():
 
 @client_bp.route('/transactions', methods=['GET'])
 @jwt_required()
+@response_cache.cached(per_user=False)
 def get_transactions():
     """Get transaction statistics."""
     try:
@@ -112,6 +158,7 @@ def get_transactions():
 
 @client_bp.route('/spending', methods=['GET'])
 @jwt_required()
+@response_cache.cached(per_user=False)
 def get_spending():
     """Get spending patterns."""
     try:
@@ -126,6 +173,7 @@ def get_spending():
 
 @client_bp.route('/digital-engagement', methods=['GET'])
 @jwt_required()
+@response_cache.cached(per_user=False)
 def get_digital_engagement():
     """Get digital engagement statistics."""
     try:
@@ -138,16 +186,104 @@ def get_digital_engagement():
         logging.error(f"Error getting digital engagement statistics: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@client_bp.route('/aggregate', methods=['GET'])
+@jwt_required()
+@response_cache.cached(per_user=False)
+def get_aggregate():
+    """Get filtered group-by aggregates from the columnar engine.
+
+    ``group_by=DEM_SEG,GPI_COUNTY_NAME`` picks the grouping columns and
+    ``metrics=count,avg:CEC_TOTAL_BALANCE_AMT,sum:MCC_FOOD_AMT`` the
+    aggregates (count, sum, avg, min, max). Remaining parameters are filters
+    in the same ``COLUMN__op=value`` syntax as the client search.
+    """
+    try:
+        current_user = get_jwt_identity()
+        logging.info(f"User {current_user} requested client aggregates.")
+
+        query_params = request.args.to_dict(flat=True)
+        group_by = [c.strip() for c in query_params.pop('group_by', '').split(',') if c.strip()]
+        metrics = [m.strip() for m in query_params.pop('metrics', 'count').split(',') if m.strip()]
+
+        result = client_service.aggregate_clients(group_by, metrics, query_params)
+        return jsonify(result)
+    except AggregateError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error computing client aggregates: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@client_bp.route('/eligibility', methods=['GET'])
+@jwt_required()
+@response_cache.cached(per_user=False)
+def get_eligibility():
+    """Count, per catalogue product, the clients whose profile meets its eligibility tags.
+
+    Query parameters are optional filters in the ``COLUMN__op=value`` syntax
+    of the client search, e.g. ``DEM_SEG=2`` to score a single cluster.
+    """
+    try:
+        current_user = get_jwt_identity()
+        logging.info(f"User {current_user} requested product eligibility counts.")
+
+        result = client_service.score_eligibility(request.args.to_dict(flat=True))
+        return jsonify(result)
+    except AggregateError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error scoring product eligibility: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@client_bp.route('/pool-stats', methods=['GET'])
+@jwt_required()
+def get_pool_stats():
+    """Get database connection pool statistics."""
+    try:
+        current_user = get_jwt_identity()
+        logging.info(f"User {current_user} accessed connection pool statistics.")
+
+        if current_user != "admin":
+            return jsonify({"error": "Unauthorized"}), 403
+
+        stats = client_service.get_pool_stats()
+        return jsonify(stats)
+    except Exception as e:
+        logging.error(f"Error getting connection pool statistics: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @client_bp.route('/refresh', methods=['POST'])
 @jwt_required()
 def refresh_data():
-    """Refresh client data from source."""
+    """Refresh client data from source.
+
+    The JSON body names a CSV in the data directory: ``{"delta": "file.csv"}``
+    upserts changed clients by ID, ``{"full": "file.csv"}`` swaps in a
+    complete export.
+    """
     try:
         current_user = get_jwt_identity()
         logging.info(f"User {current_user} requested data refresh.")
-        
-        client_service.refresh_data()
-        return jsonify({"message": "Data refreshed successfully"})
+
+        if current_user != "admin":
+            return jsonify({"error": "Unauthorized"}), 403
+
+        data = request.get_json(silent=True) or {}
+        # Only bare file names are accepted, resolved inside the data directory
+        delta = data.get('delta')
+        full = data.get('full')
+        if bool(delta) == bool(full):
+            return jsonify({"error": "Provide exactly one of 'delta' or 'full'"}), 400
+
+        name = os.path.basename(delta or full)
+        path = os.path.join(REFRESH_DATA_DIR, name)
+        if not os.path.isfile(path):
+            return jsonify({"error": f"File not found: {name}"}), 404
+
+        result = client_service.refresh_data(
+            delta_path=path if delta else None,
+            full_path=path if full else None
+        )
+        return jsonify({"message": "Data refreshed successfully", **result})
     except Exception as e:
         logging.error(f"Error refreshing data: {str(e)}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
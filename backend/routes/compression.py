@@ -0,0 +1,106 @@
+import gzip
+import zlib
+from typing import Iterable, Iterator, Optional, Tuple
+
+from flask import Response, request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip only without it
+    brotli = None
+
+# Only text payloads are worth compressing; everything the API returns is one of these
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/x-ndjson", "text/html", "text/plain", "text/csv"}
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best content coding the client accepts ("br" or "gzip"), honouring q-values."""
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return parse_accept_header(accept_encoding or "").best_match(supported)
+
+
+class Compression:
+    """Negotiated gzip/brotli compression of response bodies.
+
+    Bodies of at least ``min_size`` bytes are compressed with the best coding
+    in the request's Accept-Encoding (brotli when the ``brotli`` package is
+    installed, else gzip); smaller ones are not worth the CPU. Streamed
+    responses (the NDJSON export) are compressed incrementally. A compressed
+    response's ETag is made weak, since its bytes differ from the identity
+    representation the tag was computed for.
+    """
+
+    def __init__(self):
+        self.min_size = 1024
+        self.gzip_level = 6
+        self.brotli_quality = 4
+        self.enabled = False
+
+    def init_app(self, app, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.enabled = True
+        app.after_request(self.after_request)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def compress_stream(self, chunks: Iterable, encoding: str) -> Iterator[bytes]:
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            process, finish = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)  # 31: gzip container
+            process, finish = compressor.compress, compressor.flush
+        for chunk in chunks:
+            data = process(chunk.encode() if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield finish()
+
+    def encode(self, body: bytes, mimetype: Optional[str],
+               accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """Compressed body and its coding, or the body unchanged and None."""
+        if not self.enabled or len(body) < self.min_size or mimetype not in COMPRESSIBLE_MIMETYPES:
+            return body, None
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            return body, None
+        return self.compress(body, encoding), encoding
+
+    def after_request(self, response: Response) -> Response:
+        if (response.status_code != 200 or response.direct_passthrough
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add("Accept-Encoding")
+
+        if response.is_streamed:
+            encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+            if encoding is not None:
+                response.response = self.compress_stream(response.response, encoding)
+                response.headers.pop("Content-Length", None)
+                self._mark(response, encoding)
+            return response
+
+        body, encoding = self.encode(response.get_data(), response.mimetype,
+                                     request.headers.get("Accept-Encoding"))
+        if encoding is not None:
+            response.set_data(body)
+            self._mark(response, encoding)
+        return response
+
+    @staticmethod
+    def _mark(response: Response, encoding: str):
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+
+# Shared instance, configured by app.py
+compression = Compression()
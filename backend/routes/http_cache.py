@@ -0,0 +1,91 @@
+import hashlib
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from flask import Response, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+from database.bounded_cache import BoundedCache
+
+
+class ResponseCache:
+    """Conditional GET and server-side response caching keyed on the data version.
+
+    A response's strong ETag is derived from the data version, the request
+    path and query string and, for per-user endpoints, the JWT identity, so
+    it is known before the view runs: a matching ``If-None-Match`` is
+    answered with 304 straight away, without touching SQLite. With
+    ``max_bytes`` the serialised bodies of 200 responses are also kept in a
+    BoundedCache and replayed until the version changes.
+
+    Views are decorated at import time; caching only starts once
+    ``init_app`` has supplied the version function.
+    """
+
+    def __init__(self):
+        self.version_func = None
+        self.max_age = 0
+        self.bodies = None
+
+    def init_app(self, version_func: Callable[[], object], max_entries: int = 2000,
+                 max_bytes: int = 0, max_age: int = 0):
+        self.version_func = version_func
+        self.max_age = max_age
+        self.bodies = BoundedCache(max_entries=max_entries, max_bytes=max_bytes) if max_bytes > 0 else None
+
+    def etag_for(self, path: str, identity: Optional[str] = None) -> str:
+        key = f"{self.version_func()}|{identity or ''}|{path}"
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def cache_control(self) -> str:
+        # Behind JWT, so never shared caches; without max_age always revalidate
+        return f"private, max-age={self.max_age}" if self.max_age > 0 else "private, no-cache"
+
+    def get(self, etag: str) -> Optional[Tuple[bytes, str]]:
+        return self.bodies.get(etag) if self.bodies is not None else None
+
+    def put(self, etag: str, body: bytes, mimetype: str):
+        if self.bodies is not None:
+            self.bodies.set(etag, (body, mimetype))
+
+    def clear(self, *_):
+        if self.bodies is not None:
+            self.bodies.clear()
+
+    def _headers(self, response: Response, etag: str) -> Response:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = self.cache_control()
+        return response
+
+    def cached(self, per_user: bool = True):
+        """Decorate a GET view (below ``@jwt_required()``) with ETag/304 and body caching.
+
+        ``per_user`` keys the response on the caller's identity; statistics
+        that are the same for everyone leave it off and share cache entries.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.version_func is None:
+                    return view(*args, **kwargs)
+                etag = self.etag_for(request.full_path, get_jwt_identity() if per_user else None)
+                # Weak comparison: compressed responses carry W/"<etag>"
+                if request.if_none_match.contains_weak(etag):
+                    return self._headers(Response(status=304), etag)
+
+                hit = self.get(etag)
+                if hit is not None:
+                    body, mimetype = hit
+                    return self._headers(Response(body, mimetype=mimetype), etag)
+
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                self.put(etag, response.get_data(), response.mimetype)
+                return self._headers(response, etag)
+            return wrapper
+        return decorator
+
+
+# Shared instance, configured by app.py
+response_cache = ResponseCache()
@@ -0,0 +1,76 @@
+import datetime
+from typing import Any
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+from instrumentation import span
+
+try:
+    import orjson
+except ImportError:  # optional dependency, falls back to the standard library encoder
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Values neither encoder handles natively: NumPy/pandas scalars and arrays, dates, sets."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        # pandas.Timestamp is a datetime subclass, which orjson does not accept
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    # Decimal, UUID, dataclasses, Markup
+    return DefaultJSONProvider.default(obj)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson when it is installed.
+
+    ``jsonify`` and ``app.json.response`` serialise straight to UTF-8 bytes,
+    with NumPy arrays and scalars encoded natively, instead of building a
+    str through the standard library encoder and re-encoding it. Key
+    sorting and debug indentation follow the DefaultJSONProvider settings.
+    Non-ASCII text is emitted as UTF-8 rather than escaped, and NaN as null.
+    Without orjson everything goes through DefaultJSONProvider, with the
+    same NumPy/pandas scalar support.
+    """
+
+    def _options(self, indent: bool = False) -> int:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _indent(self) -> bool:
+        return (self.compact is None and self._app.debug) or self.compact is False
+
+    @staticmethod
+    def default(obj: Any) -> Any:
+        return _default(obj)
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """Compact JSON encoding of ``obj`` as UTF-8 bytes."""
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default, option=self._options())
+        return self.dumps(obj, separators=(",", ":")).encode()
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Plain calls take the fast path; json.dumps arguments need the standard encoder
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=_default, option=self._options()).decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        with span("json.encode"):
+            if orjson is None:
+                return super().response(*args, **kwargs)
+            obj = self._prepare_response_obj(args, kwargs)
+            body = orjson.dumps(obj, default=_default,
+                                option=self._options(self._indent()) | orjson.OPT_APPEND_NEWLINE)
+            return self._app.response_class(body, mimetype=self.mimetype)
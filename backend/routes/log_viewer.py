@@ -0,0 +1,74 @@
+import os
+import time
+from typing import Iterator, List, Optional
+
+
+def tail_lines(path: str, count: int, block_size: int = 64 * 1024) -> List[str]:
+    """Last ``count`` lines of a file, oldest first.
+
+    Reads fixed-size blocks backwards from the end until enough line breaks
+    have been seen, so the cost depends on ``count`` and not on the size of
+    the file.
+    """
+    if count <= 0:
+        return []
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        blocks, breaks = [], 0
+        # One line break more than requested, so the first kept line is complete
+        while end > 0 and breaks <= count:
+            start = max(0, end - block_size)
+            f.seek(start)
+            block = f.read(end - start)
+            blocks.append(block)
+            breaks += block.count(b"\n")
+            end = start
+    data = b"".join(reversed(blocks))
+    return [line.decode("utf-8", errors="replace") for line in data.splitlines(keepends=True)[-count:]]
+
+
+def follow_lines(path: str, poll_interval: float = 0.5,
+                 heartbeat: Optional[float] = None) -> Iterator[Optional[str]]:
+    """Yield lines appended to a file from now on, like ``tail -F``.
+
+    Only new bytes are read. When the file is rotated (replaced by a new
+    inode) or truncated, reading restarts at the beginning of the new file.
+    With ``heartbeat``, None is yielded after that many idle seconds so the
+    caller can keep a connection alive and notice a client that went away.
+    """
+    f = open(path, "rb")
+    try:
+        f.seek(0, os.SEEK_END)
+        inode = os.fstat(f.fileno()).st_ino
+        pending = b""
+        idle_since = time.monotonic()
+        while True:
+            chunk = f.read()
+            if chunk:
+                *lines, pending = (pending + chunk).split(b"\n")
+                for line in lines:
+                    yield line.decode("utf-8", errors="replace")
+                idle_since = time.monotonic()
+                continue
+
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None  # between rotation's rename and the new file's creation
+            if stat is not None and (stat.st_ino != inode or stat.st_size < f.tell()):
+                if stat.st_ino != inode:
+                    # Lines written to the old file just before it was renamed
+                    for line in (pending + f.read()).split(b"\n"):
+                        if line:
+                            yield line.decode("utf-8", errors="replace")
+                f.close()
+                f = open(path, "rb")
+                inode, pending = os.fstat(f.fileno()).st_ino, b""
+                continue
+
+            if heartbeat is not None and time.monotonic() - idle_since >= heartbeat:
+                idle_since = time.monotonic()
+                yield None
+            time.sleep(poll_interval)
+    finally:
+        f.close()
@@ -0,0 +1,93 @@
+import contextvars
+import hmac
+import logging
+import threading
+import time
+from typing import Optional
+
+from flask import Response, g, jsonify, request
+from flask_jwt_extended.config import config as jwt_config
+
+from instrumentation import end_request_spans, profiler, record_span, registry, start_request_spans
+
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Time to produce a response, by route.", ["method", "route", "status"]
+)
+
+# Set when flask_jwt_extended asks for the decode key, i.e. just before the signature check
+_jwt_started = contextvars.ContextVar("jwt_started", default=None)
+
+
+def init_metrics(app, jwt_manager, token: Optional[str] = None):
+    """Per-request timing hooks, a Server-Timing breakdown and the /metrics endpoint.
+
+    Every request is observed into ``http_request_duration_seconds`` by
+    method, route rule and status. The spans recorded while serving it
+    (service methods, SQL, JWT verification, JSON encoding) are summed and
+    returned in a ``Server-Timing`` header. When the sampling profiler has
+    been enabled, a request with an ``X-Profile: 1`` header is profiled and
+    the response names the stored profile in ``X-Profile-Id``.
+
+    /metrics requires ``Authorization: Bearer <token>`` and is not served
+    at all (404) without a configured ``token``.
+    """
+
+    @jwt_manager.decode_key_loader
+    def _decode_key(jwt_header, jwt_data):
+        _jwt_started.set(time.perf_counter())
+        return jwt_config.decode_key
+
+    @jwt_manager.token_verification_loader
+    def _token_verified(jwt_header, jwt_data):
+        started = _jwt_started.get()
+        if started is not None:
+            record_span("jwt.verify", time.perf_counter() - started)
+            _jwt_started.set(None)
+        return True
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+        g.metrics_spans = start_request_spans()
+        if profiler.enabled and request.headers.get("X-Profile") == "1":
+            g.profile_session = profiler.start(threading.get_ident())
+
+    @app.after_request
+    def _observe(response: Response) -> Response:
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        REQUEST_SECONDS.observe(elapsed, method=request.method, route=route, status=str(response.status_code))
+
+        spans = end_request_spans(g.pop("metrics_spans"))
+        timings = [f'{name.replace(" ", "_")};dur={seconds * 1000:.2f};desc="{calls}x"'
+                   for name, (seconds, calls) in spans.items()]
+        timings.append(f"total;dur={elapsed * 1000:.2f}")
+        response.headers["Server-Timing"] = ", ".join(timings)
+
+        session = g.pop("profile_session", None)
+        if session is not None:
+            profile_id = profiler.finish(session, f"{request.method} {request.full_path}")
+            response.headers["X-Profile-Id"] = profile_id
+            logging.info(f"Profiled {request.method} {request.path} as profile {profile_id}")
+        return response
+
+    @app.teardown_request
+    def _stop_profiler(_):
+        # A request that failed before after_request must not leave its sampler running
+        session = g.pop("profile_session", None)
+        if session is not None:
+            session.stop()
+
+    @app.route("/metrics")
+    def metrics():
+        if not token:
+            return jsonify({"error": "Not found"}), 404
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").encode()
+        if not hmac.compare_digest(supplied, token.encode()):
+            return jsonify({"error": "Unauthorized"}), 401
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    logging.info("Request metrics initialized")
@@ -79,6 +79,45 @@ interface OffersResponse {
   }
 }
 
+interface DashboardResponse {
+  client_id: string
+  profile: any
+  segments: Record<string, { cluster: number | null, name: string | null }>
+  products: {
+    client_id: string
+    products: any[]
+  }
+  offers: OffersResponse["offers"]
+}
+
+// Shown when the offers cannot be loaded
+const DEFAULT_FEATURED_OFFERS = [
+  {
+    id: "1",
+    title: "George Pay Special",
+    description: "Get 10% cashback on your first payment with George Pay",
+    category: "DIGITAL",
+    link: null,
+    eligibility: 0
+  },
+  {
+    id: "2",
+    title: "Credit Card Offer",
+    description: "Apply for a new credit card and get bonus points",
+    category: "FINANCIAL",
+    link: null,
+    eligibility: 18
+  },
+  {
+    id: "3",
+    title: "Savings Account",
+    description: "Open a savings account with competitive interest rates",
+    category: "BANKING",
+    link: null,
+    eligibility: 0
+  }
+]
+
 const ROMANIAN_MALE_NAMES = [
   "Andrei", "Mihai", "Alexandru", "Ion", "Cristian", "Vlad", "Gabriel",
   "Florin", "Radu", "Ștefan", "Cătălin", "Valentin", "Bogdan", "Alin",
@@ -379,7 +418,7 @@ export default function DashboardPage() {
 
 
   useEffect(() => {
-    const fetchUserData = async () => {
+    const fetchDashboard = async () => {
       // Check if user is authenticated
       const isAuthenticated = localStorage.getItem("isAuthenticated")
       const userType = localStorage.getItem("userType")
@@ -393,25 +432,27 @@ export default function DashboardPage() {
 
       if (userType === "admin") {
         setUserName("Admin")
+        setFeaturedOffers(DEFAULT_FEATURED_OFFERS)
         setIsLoading(false)
         return
       }
 
-      // Try to fetch real user data
+      // Profile and offers come back together from /user/dashboard
       setIsLoading(true)
       try {
-        const response = await axios.get("http://127.0.0.1:5000/user/profile", {
+        const response = await axios.get<DashboardResponse>("http://127.0.0.1:5000/user/dashboard", {
           headers: {
             'Authorization': `Bearer ${localStorage.getItem("accessToken")}`
           },
           timeout: 5000 // 5 second timeout
         })
 
-        console.log("User data fetched:", response.data)
-        setUserData(response.data)
+        const profile = response.data.profile
+        console.log("User data fetched:", profile)
+        setUserData(profile)
 
         // Calculate dashboard metrics from user data
-        const metrics = calculateDashboardMetrics(response.data)
+        const metrics = calculateDashboardMetrics(profile)
         setDashboardMetrics(metrics)
 
         // Debug log for spending data
@@ -419,41 +460,11 @@ export default function DashboardPage() {
         console.log("Total spending:", formatCurrency(metrics.totalSpending))
 
         // Set user name from occupation or default
-        const genderCode = response.data.GPI_GENDER_CODE || "M";
+        const genderCode = profile.GPI_GENDER_CODE || "M";
         const randomName = getRandomNameByGender(genderCode);
         setUserName(randomName);
 
-        setError(null)
-      } catch (error) {
-        console.error("Error fetching user data:", error)
-        setError("Failed to load user data")
-        // Continue with mock data on error
-      } finally {
-        setIsLoading(false)
-      }
-    }
-
-    fetchUserData()
-  }, [])
-
-  useEffect(() => {
-    const fetchUserData = async () => {
-      // ... existing code for user data ...
-    }
-
-    // Add this new function to fetch offers
-    const fetchOffers = async () => {
-      try {
-        const response = await axios.get<OffersResponse>("http://127.0.0.1:5000/user/offers", {
-          headers: {
-            'Authorization': `Bearer ${localStorage.getItem("accessToken")}`
-          },
-          timeout: 5000
-        })
-
-        console.log("Offers fetched:", response.data)
-
-        // Extract first 3 offers and format them
+        // Extract first offers and format them
         const offers = response.data.offers.offers.slice(1, 5).map((offer, index) => ({
           id: index.toString(),
           title: offer.PROD,
@@ -466,45 +477,19 @@ export default function DashboardPage() {
 
         setFeaturedOffers(offers)
         console.log("Featured offers set:", offers)
+
+        setError(null)
       } catch (error) {
-        console.error("Error fetching offers:", error)
-        // Set default offers if API fails
-        setFeaturedOffers([
-          {
-            id: "1",
-            title: "George Pay Special",
-            description: "Get 10% cashback on your first payment with George Pay",
-            category: "DIGITAL",
-            link: null,
-            eligibility: 0
-          },
-          {
-            id: "2",
-            title: "Credit Card Offer",
-            description: "Apply for a new credit card and get bonus points",
-            category: "FINANCIAL",
-            link: null,
-            eligibility: 18
-          },
-          {
-            id: "3",
-            title: "Savings Account",
-            description: "Open a savings account with competitive interest rates",
-            category: "BANKING",
-            link: null,
-            eligibility: 0
-          }
-        ])
+        console.error("Error fetching dashboard data:", error)
+        setError("Failed to load user data")
+        // Continue with mock data and default offers on error
+        setFeaturedOffers(DEFAULT_FEATURED_OFFERS)
+      } finally {
+        setIsLoading(false)
       }
     }
 
-    fetchUserData()
-
-    // Only fetch offers if user is authenticated
-    const isAuthenticated = localStorage.getItem("isAuthenticated")
-    if (isAuthenticated) {
-      fetchOffers()
-    }
+    fetchDashboard()
   }, [])
 
   // Loading skeleton
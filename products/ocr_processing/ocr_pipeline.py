@@ -0,0 +1,219 @@
+"""Procesare OCR în lot, comună pentru script.py și script2.py.
+
+Fișierele din folderul de intrare sunt procesate în paralel, câte unul pe
+proces, cu un timeout pe fișier. Rezultatele (și erorile) sunt ținute în
+``manifest.json`` din folderul de ieșire, salvat după fiecare fișier
+terminat: la o nouă rulare, inclusiv după o întrerupere, sunt sărite
+fișierele deja procesate cu aceleași setări și al căror conținut nu s-a
+schimbat (dimensiune + mtime, apoi hash SHA-256).
+"""
+import argparse
+import hashlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+MANIFEST_NAME = "manifest.json"
+DEFAULT_TIMEOUT = 600  # secunde pe fișier
+
+# Câte fire primește fiecare ocrmypdf; setat în fiecare proces de lucru
+_jobs_per_file = 1
+
+
+class OcrError(Exception):
+    pass
+
+
+class OcrTimeout(OcrError):
+    pass
+
+
+def remaining(deadline: float) -> float:
+    """Secundele rămase până la ``deadline`` (time.monotonic); OcrTimeout dacă a trecut."""
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise OcrTimeout("timpul alocat fișierului a expirat")
+    return left
+
+
+def run_ocrmypdf(input_path: str, output_path: str, options: List[str], deadline: float):
+    """Rulează ocrmypdf și verifică codul de ieșire."""
+    command = ["ocrmypdf", "--jobs", str(_jobs_per_file), *options, input_path, output_path]
+    # Sesiune proprie, ca la timeout să oprim și tesseract/ghostscript pornite de ocrmypdf
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                               start_new_session=True)
+    try:
+        _, stderr = process.communicate(timeout=remaining(deadline))
+    except (subprocess.TimeoutExpired, OcrTimeout):
+        os.killpg(process.pid, signal.SIGKILL)
+        process.communicate()
+        raise OcrTimeout("ocrmypdf a depășit timpul alocat")
+    if process.returncode != 0:
+        last_line = (stderr.strip().splitlines() or [""])[-1]
+        raise OcrError(f"ocrmypdf a ieșit cu codul {process.returncode}: {last_line}")
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Starea fiecărui fișier de intrare, scrisă atomic pe disc."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.entries = json.load(f)["files"]
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[⚠] Manifest ilizibil ({e}), îl refac: {path}")
+
+    def save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.entries}, f, indent=2, ensure_ascii=False, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def input_state(self, filename: str, input_path: str) -> Dict:
+        """Dimensiune, mtime și hash; hash-ul e refolosit dacă fișierul nu s-a atins."""
+        stat = os.stat(input_path)
+        previous = self.entries.get(filename, {})
+        if previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+            sha256 = previous["sha256"]
+        else:
+            sha256 = file_hash(input_path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+
+    def is_current(self, filename: str, state: Dict, output_path: str, settings: List[str],
+                   skip_failed: bool) -> bool:
+        entry = self.entries.get(filename)
+        if entry is None:
+            # Ieșire făcută înainte de manifest: o păstrăm dacă e mai nouă decât intrarea
+            if os.path.exists(output_path) and os.path.getmtime(output_path) >= state["mtime_ns"] / 1e9:
+                self.entries[filename] = {**state, "settings": settings, "status": "ok",
+                                          "output": output_path, "adopted": True}
+                return True
+            return False
+        if entry.get("sha256") != state["sha256"] or entry.get("settings") != settings:
+            return False
+        entry.update(size=state["size"], mtime_ns=state["mtime_ns"])  # atins, dar neschimbat
+        if entry["status"] == "ok":
+            return os.path.exists(output_path)
+        return skip_failed
+
+
+def _init_worker(jobs_per_file: int):
+    global _jobs_per_file
+    _jobs_per_file = jobs_per_file
+
+
+def _run_job(process: Callable[[str, str, float], None], input_path: str, output_path: str,
+             timeout: float) -> Dict:
+    """Procesează un fișier în procesul de lucru; ieșirea apare doar dacă a reușit."""
+    root, ext = os.path.splitext(output_path)
+    partial_path = f"{root}.part{ext}"
+    started = time.monotonic()
+    try:
+        process(input_path, partial_path, started + timeout)
+        os.replace(partial_path, output_path)
+        result = {"status": "ok", "error": None}
+    except OcrTimeout as e:
+        result = {"status": "timeout", "error": str(e)}
+    except Exception as e:
+        result = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    result["seconds"] = round(time.monotonic() - started, 2)
+    return result
+
+
+def run_batch(input_folder: str, output_folder: str, process: Callable[[str, str, float], None],
+              settings: List[str], workers: Optional[int] = None, timeout: float = DEFAULT_TIMEOUT,
+              force: bool = False, skip_failed: bool = False) -> int:
+    """Aplică ``process(input_path, output_path, deadline)`` pe fiecare PDF din ``input_folder``.
+
+    ``settings`` (opțiunile care influențează rezultatul) intră în manifest:
+    dacă se schimbă, fișierele sunt reprocesate. Întoarce numărul de eșecuri.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    manifest = Manifest(os.path.join(output_folder, MANIFEST_NAME))
+
+    pending = {}
+    skipped = 0
+    for filename in sorted(os.listdir(input_folder)):
+        if not filename.lower().endswith(".pdf"):
+            continue
+        input_path = os.path.join(input_folder, filename)
+        output_path = os.path.join(output_folder, filename)
+        state = manifest.input_state(filename, input_path)
+        if not force and manifest.is_current(filename, state, output_path, settings, skip_failed):
+            skipped += 1
+            continue
+        pending[filename] = (input_path, output_path, state)
+    manifest.save()
+
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, len(pending) or 1))
+    print(f"[📄] {len(pending)} fișiere de procesat, {skipped} la zi; {workers} procese")
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(max(1, cpus // workers),)) as pool:
+        futures = {pool.submit(_run_job, process, input_path, output_path, timeout): filename
+                   for filename, (input_path, output_path, _) in pending.items()}
+        submitted_at = time.monotonic()
+        for done, future in enumerate(as_completed(futures), 1):
+            filename = futures[future]
+            input_path, output_path, state = pending[filename]
+            try:
+                result = future.result()
+            except Exception as e:  # procesul de lucru a murit
+                result = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+            manifest.entries[filename] = {
+                **state, **result,
+                "settings": settings,
+                "output": output_path,
+                "finished_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            manifest.save()
+            if result["status"] == "ok":
+                print(f"[✔] ({done}/{len(pending)}) Gata: {output_path}")
+            else:
+                failures += 1
+                print(f"[❌] ({done}/{len(pending)}) Eroare la: {filename} ({result['status']}: {result['error']})")
+
+    if pending:
+        print(f"\n{len(pending) - failures} procesate, {failures} eșuate, {skipped} sărite "
+              f"în {time.monotonic() - submitted_at:.1f}s. Manifest: {manifest.path}")
+    return failures
+
+
+def main(input_folder: str, output_folder: str, process: Callable[[str, str, float], None],
+         settings: List[str]):
+    """Punctul de intrare comun al scripturilor, cu opțiunile din linia de comandă."""
+    parser = argparse.ArgumentParser(description=f"OCR în lot: {input_folder} -> {output_folder}")
+    parser.add_argument("--workers", type=int, help="procese în paralel (implicit: numărul de nuclee)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="secunde pe fișier")
+    parser.add_argument("--force", action="store_true", help="reprocesează tot, ignorând manifestul")
+    parser.add_argument("--skip-failed", action="store_true",
+                        help="nu reîncerca fișierele nemodificate care au eșuat data trecută")
+    args = parser.parse_args()
+
+    failures = run_batch(input_folder, output_folder, process, settings, args.workers, args.timeout,
+                         args.force, args.skip_failed)
+    if failures:
+        sys.exit(1)
+    print("\n🎉 Toate documentele au fost procesate.")
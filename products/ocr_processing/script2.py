@@ -1,58 +1,57 @@
 import os
-import subprocess
+import tempfile
+
 from pdf2image import convert_from_path
 from PIL import Image, ImageEnhance
 from fpdf import FPDF
 
+from ocr_pipeline import main, remaining, run_ocrmypdf
+
 # === Setări ===
 input_folder = "pdf_raw"
 temp_folder = "temp_pdf_cleaned"
 output_folder = "pdf_ocr_var2"
 
-os.makedirs(temp_folder, exist_ok=True)
-os.makedirs(output_folder, exist_ok=True)
-
 dpi = 300
+threshold = 150
+
+ocr_options = [
+    "--skip-text",
+    "--output-type", "pdf",
+    "--language", "ron+eng",
+    "--optimize", "3",
+    "--deskew",
+]
 
 def preprocess_image(img: Image.Image) -> Image.Image:
     img = img.convert("L")  # Gri
     img = ImageEnhance.Contrast(img).enhance(2.0)
-    threshold = 150
     return img.point(lambda x: 255 if x > threshold else 0)
 
 def create_pdf_from_images(images, output_path):
     pdf = FPDF()
-    for img in images:
-        temp_img = "temp.jpg"
-        img.save(temp_img, "JPEG")
-        pdf.add_page()
-        pdf.image(temp_img, x=0, y=0, w=210, h=297)
-        os.remove(temp_img)
-    pdf.output(output_path)
-
-for filename in os.listdir(input_folder):
-    if not filename.lower().endswith(".pdf"):
-        continue
-
-    input_path = os.path.join(input_folder, filename)
-    temp_clean_pdf = os.path.join(temp_folder, f"cleaned_{filename}")
-    final_pdf = os.path.join(output_folder, filename)
-
-    print(f"[🔧] Procesare imagine: {filename}")
-    pages = convert_from_path(input_path, dpi=dpi)
+    # Un folder temporar per fișier: procesele în paralel nu-și suprascriu imaginile
+    with tempfile.TemporaryDirectory(dir=temp_folder) as image_folder:
+        for i, img in enumerate(images):
+            temp_img = os.path.join(image_folder, f"page_{i}.jpg")
+            img.save(temp_img, "JPEG")
+            pdf.add_page()
+            pdf.image(temp_img, x=0, y=0, w=210, h=297)
+        pdf.output(output_path)
+
+# === Curățare imagine + OCR pe un fișier PDF (rulat în paralel de ocr_pipeline) ===
+def clean_and_ocr_file(input_path: str, output_path: str, deadline: float):
+    temp_clean_pdf = os.path.join(temp_folder, f"cleaned_{os.path.basename(input_path)}")
+
+    pages = convert_from_path(input_path, dpi=dpi, timeout=remaining(deadline))
     processed = [preprocess_image(p) for p in pages]
     create_pdf_from_images(processed, temp_clean_pdf)
 
-    print(f"[🧠] Aplic OCR: {filename}")
-    subprocess.run([
-        "ocrmypdf",
-        "--skip-text",
-        "--output-type", "pdf",
-        "--language", "ron+eng",
-        "--optimize", "3",
-        "--deskew",
-        temp_clean_pdf,
-        final_pdf
-    ])
-
-    print(f"[✔] Gata: {final_pdf}")
+    run_ocrmypdf(temp_clean_pdf, output_path, ocr_options, deadline)
+
+
+if __name__ == "__main__":
+    os.makedirs(temp_folder, exist_ok=True)
+    # Preprocesarea face parte din rezultat: dacă se schimbă, se reprocesează tot
+    main(input_folder, output_folder, clean_and_ocr_file,
+         settings=[f"dpi={dpi}", f"threshold={threshold}", *ocr_options])